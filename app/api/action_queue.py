@@ -0,0 +1,186 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, List
+from loguru import logger
+from pydantic import BaseModel, Field
+from app.api.utils import ExecutionStopError
+from app.services.metrics import ACTION_QUEUE_DEPTH
+from app.services.scheduler_state import action_inbox
+from app.services.state_store import load_json_state, save_json_state
+
+ACTION_QUEUE_FILE = os.getenv("ACTION_QUEUE_FILE", "action_queue.json")
+ACTION_MIN_DELAY = int(os.getenv("ACTION_MIN_DELAY", "25"))  # seconds
+ACTION_MAX_DELAY = int(os.getenv("ACTION_MAX_DELAY", "35"))  # seconds
+ACTION_MAX_PER_HOUR = int(os.getenv("ACTION_MAX_PER_HOUR", "20"))
+ACTION_MAX_ATTEMPTS = 3
+ACTION_RETRY_DELAY = 60  # seconds
+
+class PendingAction(BaseModel):
+    action: str
+    tweet_id: str
+    enqueued_at: datetime = Field(default_factory=datetime.now)
+    attempts: int = 0
+
+class ActionQueueStatus(BaseModel):
+    is_running: bool
+    queue_depth: int
+    processed: int
+    failed: int
+    actions_last_hour: int
+    max_actions_per_hour: int
+    pending: List[PendingAction]
+
+class ActionQueue:
+    """Background queue for deferred account actions (likes) with its own rate budget"""
+
+    def __init__(self):
+        self.task = None
+        self.is_running = False
+        self.pending: Deque[PendingAction] = deque()
+        self.has_pending = asyncio.Event()
+        self.recent_actions: Deque[float] = deque()
+        self.processed_count = 0
+        self.failed_count = 0
+
+    async def enqueue(self, action: str, tweet_id: str) -> bool:
+        """Add an action to the queue and return immediately; duplicates are ignored"""
+        item = PendingAction(action=action, tweet_id=str(tweet_id))
+        if not self.is_running:
+            # Only the scheduler leader runs the worker and owns ACTION_QUEUE_FILE
+            try:
+                await action_inbox.push(item.model_dump(mode="json"))
+            except ExecutionStopError:
+                raise
+            except Exception as e:
+                logger.error(f"🚨 Failed to hand {action} for tweet {tweet_id} to the scheduler leader: {str(e)}")
+                return False
+            logger.info(f"📤  Handed {action} for tweet {tweet_id} to the scheduler leader")
+            return True
+        if not self._add(item):
+            return False
+
+        await self._persist()
+        self.has_pending.set()
+        logger.info(f"📥  Queued {action} for tweet {tweet_id} (queue depth: {len(self.pending)})")
+        return True
+
+    def _add(self, item: PendingAction) -> bool:
+        if any(pending.action == item.action and pending.tweet_id == item.tweet_id for pending in self.pending):
+            return False
+        self.pending.append(item)
+        return True
+
+    async def take_handed_over(self):
+        """Queue the actions other processes handed over while this one was not running the queue"""
+        if not self.is_running:
+            return
+        added = [item for item in (PendingAction(**action) for action in await action_inbox.take()) if self._add(item)]
+        if added:
+            await self._persist()
+            self.has_pending.set()
+            logger.info(f"📥  Queued {len(added)} actions handed over by other processes (queue depth: {len(self.pending)})")
+
+    async def _persist(self):
+        try:
+            await save_json_state(ACTION_QUEUE_FILE, [item.model_dump(mode="json") for item in self.pending])
+        except ExecutionStopError:
+            raise
+        except Exception as e:
+            logger.error(f"🚨 Failed to persist action queue: {str(e)}")
+
+    def _load(self):
+        items = load_json_state(ACTION_QUEUE_FILE, [])
+        self.pending = deque(PendingAction(**item) for item in items)
+        if self.pending:
+            logger.info(f"📥  Restored {len(self.pending)} pending actions")
+            self.has_pending.set()
+
+    def _actions_last_hour(self) -> int:
+        hour_ago = time.monotonic() - 3600
+        while self.recent_actions and self.recent_actions[0] < hour_ago:
+            self.recent_actions.popleft()
+        return len(self.recent_actions)
+
+    async def _wait_for_budget(self):
+        while self._actions_last_hour() >= ACTION_MAX_PER_HOUR:
+            wait_time = self.recent_actions[0] + 3600 - time.monotonic()
+            logger.info(f"⏳  Action budget exhausted, waiting {wait_time:.0f} seconds...")
+            await asyncio.sleep(max(wait_time, 1))
+
+    async def _execute(self, item: PendingAction):
+        from app.api.endpoints.tweets import favorite_tweet
+
+        if item.action == "favorite":
+            await favorite_tweet(item.tweet_id)
+            return
+        raise ValueError(f"Unknown action: {item.action}")
+
+    async def process_actions(self):
+        logger.info("🏁  Action queue worker started")
+
+        while self.is_running:
+            if not self.pending:
+                self.has_pending.clear()
+                await self.has_pending.wait()
+                continue
+
+            await self._wait_for_budget()
+
+            delay = random.randint(ACTION_MIN_DELAY, ACTION_MAX_DELAY)
+            item = self.pending[0]
+            logger.info(f"⏳  Will try to {item.action} tweet {item.tweet_id} in {delay} seconds...")
+            await asyncio.sleep(delay)
+
+            self.pending.popleft()
+            self.recent_actions.append(time.monotonic())
+            try:
+                await self._execute(item)
+                self.processed_count += 1
+            except ExecutionStopError:
+                self.pending.appendleft(item)
+                raise
+            except Exception as e:
+                item.attempts += 1
+                logger.error(f"Failed to {item.action} tweet {item.tweet_id} (attempt {item.attempts}): {str(e)}")
+                if item.attempts < ACTION_MAX_ATTEMPTS:
+                    self.pending.append(item)
+                    await asyncio.sleep(ACTION_RETRY_DELAY)
+                else:
+                    self.failed_count += 1
+            await self._persist()
+
+    def start(self):
+        if self.is_running:
+            return False
+        self._load()
+        self.is_running = True
+        self.task = asyncio.create_task(self.process_actions())
+        return True
+
+    def stop(self):
+        if not self.is_running:
+            return False
+        self.is_running = False
+        if self.task:
+            self.task.cancel()
+        logger.info("🚧  Action queue worker stopped")
+        return True
+
+    def status(self) -> ActionQueueStatus:
+        return ActionQueueStatus(
+            is_running=self.is_running,
+            queue_depth=len(self.pending),
+            processed=self.processed_count,
+            failed=self.failed_count,
+            actions_last_hour=self._actions_last_hour(),
+            max_actions_per_hour=ACTION_MAX_PER_HOUR,
+            pending=list(self.pending)
+        )
+
+# Create a global instance of the action queue
+action_queue = ActionQueue()
+ACTION_QUEUE_DEPTH.set_function(lambda: len(action_queue.pending))
@@ -1,4 +1,24 @@
+from functools import lru_cache
+from app.config import get_twitter_accounts
 from app.services.twitter import TwitterClient
+from app.services.twitter_pool import TwitterClientPool
 
-# Create shared instances
-twitter_client = TwitterClient() 
\ No newline at end of file
+@lru_cache()
+def get_twitter_pool() -> TwitterClientPool:
+    """
+    Shared pool of Twitter accounts, created on first use
+    Primary account from the environment first, then additional read accounts
+    """
+    accounts = [TwitterClient()]
+    for account in get_twitter_accounts():
+        credentials = {
+            'username': account['username'],
+            'email': account.get('email'),
+            'password': account.get('password')
+        }
+        accounts.append(TwitterClient(credentials=credentials, cookies_path=account['cookies_file']))
+    return TwitterClientPool(accounts)
+
+def get_twitter_client() -> TwitterClient:
+    """Primary Twitter account, used for writes and the scheduler"""
+    return get_twitter_pool().primary
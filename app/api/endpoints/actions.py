@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from app.api.action_queue import action_queue, ActionQueueStatus
+
+router = APIRouter()
+
+@router.get("/", response_model=ActionQueueStatus)
+async def get_action_queue_status():
+    """Get the deferred action queue depth and pending actions"""
+    return action_queue.status()
@@ -0,0 +1,55 @@
+import asyncio
+import os
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from loguru import logger
+from app.api.common import get_twitter_client
+from app.api.utils import ExecutionStopError
+from app.services.supabase import get_supabase, execute_query
+
+router = APIRouter()
+
+READY_CHECK_TIMEOUT = float(os.getenv("READY_CHECK_TIMEOUT", "5"))  # seconds
+
+async def check_twitter() -> bool:
+    # Shielded so a slow login is not cancelled by the probe timeout
+    authenticated = await asyncio.wait_for(
+        asyncio.shield(get_twitter_client().ensure_authenticated()), timeout=READY_CHECK_TIMEOUT
+    )
+    if not authenticated:
+        # ensure_authenticated gives up for good once its retries are used up
+        raise RuntimeError("Twitter authentication retries exhausted")
+    return True
+
+async def check_database() -> bool:
+    query = get_supabase().table('tweets').select('tweet_id').limit(1)
+    await asyncio.wait_for(execute_query(query, 'ready_check'), timeout=READY_CHECK_TIMEOUT)
+    return True
+
+@router.get("/healthz")
+async def liveness(request: Request):
+    """Liveness probe: the process is up and serving requests"""
+    return {
+        "status": "ok",
+        "import_time": getattr(request.app.state, "import_time", None),
+        "startup_time": getattr(request.app.state, "startup_time", None)
+    }
+
+@router.get("/readyz")
+async def readiness():
+    """Readiness probe: Twitter authentication works and the database is reachable"""
+    checks = {}
+    for name, check in (("twitter", check_twitter), ("database", check_database)):
+        try:
+            checks[name] = await check()
+        except ExecutionStopError:
+            raise
+        except Exception as e:
+            logger.warning(f"Readiness check {name} failed: {str(e) or type(e).__name__}")
+            checks[name] = False
+
+    is_ready = all(checks.values())
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"status": "ready" if is_ready else "not_ready", "checks": checks}
+    )
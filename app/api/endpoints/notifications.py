@@ -1,18 +1,28 @@
 from fastapi import APIRouter, HTTPException, Query, Body
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
 from pydantic import BaseModel, Field
-from app.api.common import twitter_client
-from app.api.utils import handle_twitter_request, process_tweet_details
+from app.api.utils import handle_twitter_request, process_tweet_details, ExecutionStopError, iterate_pages
 from loguru import logger
+import asyncio
 import os
+from contextlib import aclosing
 from enum import Enum
 from app.models.schemas import SearchParams
 from app.models.tweet_schemas import TweetDetails
+from app.services.cache import tweet_cache
+from app.services.notification_capture import notification_capture, NotificationCaptureStatus
+from app.services.notification_state import notification_poll_state, NotificationPollState
+from app.services.processed_index import processed_index
 
 router = APIRouter()
 
-USE_TWITTER_MOCKS = os.getenv("USE_TWITTER_MOCKS", "false").lower() == "true"
+# Tweets fetched at the same time while processing a notification batch
+NOTIFICATION_BATCH_CONCURRENCY = int(os.getenv("NOTIFICATION_BATCH_CONCURRENCY", "5"))
+NOTIFICATION_BATCH_MAX_SIZE = int(os.getenv("NOTIFICATION_BATCH_MAX_SIZE", "100"))
+# Pages an incremental poll goes back to reach the previous poll, and the delay between them
+NOTIFICATION_POLL_MAX_PAGES = int(os.getenv("NOTIFICATION_POLL_MAX_PAGES", "5"))
+NOTIFICATION_POLL_PAGE_DELAY = (1, 3)
 
 class NotificationType(str, Enum):
     ALL = "All"
@@ -56,6 +66,124 @@ class NotificationPayload(BaseModel):
     test_mode: bool = Field(default=False)
     reprocessed: bool = Field(default=False)
 
+class NotificationBatchResult(BaseModel):
+    results: List[dict]
+    succeeded: int
+    skipped: int
+    failed: int
+
+async def fetch_notification_stream(stream_type: NotificationType, limit: int, cursor: Optional[str]):
+    async def fetch_notifications(client):
+        logger.debug(f"📨 Fetching notifications of type: {stream_type.value}")
+        notifications = await client.get_notifications(type=stream_type.value, count=limit, cursor=cursor)
+        notification_capture.capture(stream_type.value, notifications)
+        return notifications
+
+    return await handle_twitter_request(
+        fetch_notifications,
+        'get_notifications',
+        coalesce_key=('get_notifications', stream_type.value, limit, cursor)
+    )
+
+async def fetch_stream_since(stream_type: NotificationType, limit: int, newest_timestamp_ms: int) -> list:
+    """
+    Fetch the notifications of a stream newer than newest_timestamp_ms, newest first
+
+    Twitter returns no cursor above the newest notification, so polls start from the newest page
+    and page back until they reach the saved position. Without one only the newest page is taken.
+    """
+    new_notifications = {}
+    max_items = limit * NOTIFICATION_POLL_MAX_PAGES
+    pages = iterate_pages(
+        lambda client: client.get_notifications(type=stream_type.value, count=limit),
+        'get_notifications',
+        max_items,
+        delay_range=NOTIFICATION_POLL_PAGE_DELAY
+    )
+    async with aclosing(pages):
+        async for page in pages:
+            notification_capture.capture(stream_type.value, page)
+            newer = [notif for notif in page if (getattr(notif, 'timestamp_ms', 0) or 0) > newest_timestamp_ms]
+            for notif in newer:
+                new_notifications.setdefault(notif.id, notif)
+            if not newest_timestamp_ms or len(newer) < len(page):
+                break
+        else:
+            if newest_timestamp_ms and len(new_notifications) >= max_items:
+                logger.warning(f"⚠️  Stopped paging {stream_type.value} notifications after {max_items} new ones, older ones are skipped")
+    return list(new_notifications.values())
+
+async def fetch_new_notifications(
+    stream_types: List[NotificationType],
+    limit: int,
+    poll_state: NotificationPollState,
+    reset: bool = False
+) -> list:
+    """Fetch every stream back to its saved position and keep only notifications newer than it"""
+    async with poll_state.lock:
+        positions = {}
+        for stream_type in stream_types:
+            if reset:
+                await poll_state.reset(stream_type.value)
+            positions[stream_type] = await poll_state.get(stream_type.value)
+
+        stream_results = await asyncio.gather(
+            *(fetch_stream_since(stream_type, limit, positions[stream_type].newest_timestamp_ms) for stream_type in stream_types),
+            return_exceptions=True
+        )
+
+        for stream_type, result in zip(stream_types, stream_results):
+            if isinstance(result, BaseException):
+                continue
+            await poll_state.advance(
+                stream_type.value,
+                max(((getattr(notif, 'timestamp_ms', 0) or 0) for notif in result), default=0)
+            )
+        await poll_state.save()
+        return stream_results
+
+async def fetch_notification_streams(
+    notification_type: NotificationType,
+    limit: int,
+    cursor: Optional[str] = None,
+    include_mentions: bool = True,
+    poll_state: Optional[NotificationPollState] = None,
+    reset: bool = False
+) -> List[Tuple[NotificationType, object]]:
+    """
+    Fetch the requested stream, plus Mentions if asked, as (stream type, notification) pairs, newest first
+
+    With poll_state only notifications newer than its saved positions are returned.
+    """
+    stream_types = [notification_type]
+    if include_mentions and notification_type != NotificationType.MENTIONS:
+        stream_types.append(NotificationType.MENTIONS)
+
+    # Streams are fetched concurrently; a failed stream is skipped unless all of them failed
+    if poll_state is not None:
+        stream_results = await fetch_new_notifications(stream_types, limit, poll_state, reset)
+    else:
+        stream_results = await asyncio.gather(
+            *(fetch_notification_stream(stream_type, limit, cursor) for stream_type in stream_types),
+            return_exceptions=True
+        )
+    failures = [result for result in stream_results if isinstance(result, BaseException)]
+    for failure in failures:
+        if isinstance(failure, ExecutionStopError):
+            raise failure
+    if len(failures) == len(stream_results):
+        raise failures[0]
+
+    # Merge the streams, keeping the first occurrence of notifications present in both
+    merged = {}
+    for stream_type, result in zip(stream_types, stream_results):
+        if isinstance(result, BaseException):
+            logger.warning(f"⚠️  Skipping {stream_type.value} notifications: {str(result)}")
+            continue
+        for notif in result:
+            merged.setdefault(notif.id, (stream_type, notif))
+    return sorted(merged.values(), key=lambda item: getattr(item[1], 'timestamp_ms', 0) or 0, reverse=True)
+
 @router.get("/", response_model=List[NotificationData])
 async def get_notifications(
     notification_type: NotificationType = Query(
@@ -64,7 +192,9 @@ async def get_notifications(
     ),
     limit: int = Query(default=40, ge=1, le=100, description="Number of notifications to retrieve"),
     cursor: Optional[str] = Query(default=None, description="Cursor for pagination"),
-    include_mentions: bool = Query(default=True, description="Include mentions notifications")
+    include_mentions: bool = Query(default=True, description="Include mentions notifications"),
+    incremental: bool = Query(default=False, description="Return only notifications newer than the previous incremental poll"),
+    reset: bool = Query(default=False, description="Forget the incremental position and start from the newest page")
 ):
     """
     Fetch user notifications from Twitter
@@ -73,120 +203,24 @@ async def get_notifications(
     - limit: Number of notifications to retrieve (1-100, default=40)
     - cursor: Cursor for pagination
     - include_mentions: Whether to include mentions notifications (default: True)
+    - incremental: Continue from the position saved by the previous incremental poll, per stream (cursor is ignored)
+    - reset: Start incremental polling over from the newest page
     """
-    logger.info(f"🔔  Fetching notifications (type={notification_type}, count={limit}, cursor={cursor}, include_mentions={include_mentions})...")
+    logger.info(f"🔔  Fetching notifications (type={notification_type}, count={limit}, cursor={cursor}, include_mentions={include_mentions}, incremental={incremental})...")
     
-    if USE_TWITTER_MOCKS:
-        logger.warning("🚧 Notifications are not available in mock mode")
-        return []
-
-    async def fetch_notifications():
-        try:
-            all_notifications = []
-            
-            # Get general notifications
-            logger.debug(f"📨 Fetching notifications of type: {notification_type.value}")
-            notifications = await twitter_client.client.get_notifications(
-                type=notification_type.value,
-                count=limit,
-                cursor=cursor
-            )
-            
-            # Log all messages and attributes
-            logger.info("📝 Raw notifications:")
-            for notif in notifications:
-                logger.info(f"Notification ID: {notif.id}")
-                logger.info(f"- Message: {getattr(notif, 'message', 'No message')}")
-                logger.info(f"- Type: {notification_type.value}")
-                logger.info(f"- Icon: {getattr(notif, 'icon', {})}")
-                logger.info(f"- Timestamp: {getattr(notif, 'timestamp_ms', None)}")
-                
-                # Log tweet information
-                if hasattr(notif, 'tweet') and notif.tweet:
-                    tweet = notif.tweet
-                    logger.info(f"- Tweet raw data: {getattr(tweet, '_data', {})}")
-                    if hasattr(tweet, '_data'):
-                        data = tweet._data
-                        logger.info(f"- Tweet reply info: "
-                            f"in_reply_to_status_id={data.get('in_reply_to_status_id')}, "
-                            f"in_reply_to_user_id={data.get('in_reply_to_user_id')}, "
-                            f"in_reply_to_screen_name={data.get('in_reply_to_screen_name')}")
-                
-                # Log user information
-                if hasattr(notif, 'from_user') and notif.from_user:
-                    logger.info(f"- From User: {vars(notif.from_user) if hasattr(notif.from_user, '__dict__') else notif.from_user}")
-                
-                # Log all available attributes
-                logger.info("- All attributes:")
-                for attr in dir(notif):
-                    if not attr.startswith('_'):
-                        try:
-                            value = getattr(notif, attr)
-                            logger.info(f"  {attr}: {value}")
-                        except Exception as e:
-                            logger.info(f"  {attr}: Error getting value - {str(e)}")
-                logger.info("---")
-            
-            all_notifications.extend(notifications)
-            
-            # If needed, get also notifications with mentions
-            if include_mentions and notification_type != NotificationType.MENTIONS:
-                logger.debug("📨 Fetching mentions notifications")
-                mentions = await twitter_client.client.get_notifications(
-                    type=NotificationType.MENTIONS.value,
-                    count=limit,
-                    cursor=cursor
-                )
-                
-                # Log messages from mentions
-                logger.info("📝 Raw mentions:")
-                for notif in mentions:
-                    logger.info(f"Notification ID: {notif.id}")
-                    logger.info(f"- Message: {getattr(notif, 'message', 'No message')}")
-                    logger.info(f"- Type: Mentions")
-                    logger.info(f"- Icon: {getattr(notif, 'icon', {})}")
-                    logger.info(f"- Timestamp: {getattr(notif, 'timestamp_ms', None)}")
-                    
-                    # Log tweet information
-                    if hasattr(notif, 'tweet') and notif.tweet:
-                        tweet = notif.tweet
-                        logger.info(f"- Tweet raw data: {getattr(tweet, '_data', {})}")
-                        if hasattr(tweet, '_data'):
-                            data = tweet._data
-                            logger.info(f"- Tweet reply info: "
-                                f"in_reply_to_status_id={data.get('in_reply_to_status_id')}, "
-                                f"in_reply_to_user_id={data.get('in_reply_to_user_id')}, "
-                                f"in_reply_to_screen_name={data.get('in_reply_to_screen_name')}")
-                    
-                    # Log user information
-                    if hasattr(notif, 'from_user') and notif.from_user:
-                        logger.info(f"- From User: {vars(notif.from_user) if hasattr(notif.from_user, '__dict__') else notif.from_user}")
-                    
-                    # Log all available attributes
-                    logger.info("- All attributes:")
-                    for attr in dir(notif):
-                        if not attr.startswith('_'):
-                            try:
-                                value = getattr(notif, attr)
-                                logger.info(f"  {attr}: {value}")
-                            except Exception as e:
-                                logger.info(f"  {attr}: Error getting value - {str(e)}")
-                    logger.info("---")
-                
-                all_notifications.extend(mentions)
-            
-            return all_notifications
-        except Exception as e:
-            logger.error(f"🚨 Error in fetch_notifications: {str(e)}")
-            raise
-
     try:
-        notifications = await handle_twitter_request(fetch_notifications)
-        notification_count = len(notifications) if notifications else 0
-        logger.info(f"📥  Received {notification_count} notifications from Twitter")
+        notifications = await fetch_notification_streams(
+            notification_type,
+            limit,
+            cursor,
+            include_mentions,
+            poll_state=notification_poll_state if incremental else None,
+            reset=reset
+        )
+        logger.info(f"📥  Received {len(notifications)} notifications from Twitter")
         
         processed_notifications = []
-        for notif in notifications:
+        for stream_type, notif in notifications:
             try:
                 # Get user data
                 from_user_data = {}
@@ -209,10 +243,6 @@ async def get_notifications(
                         'in_reply_to_user_id': getattr(tweet, 'in_reply_to_user_id', None),
                         'in_reply_to_screen_name': getattr(tweet, 'in_reply_to_screen_name', None)
                     }
-                    # Add logging for debugging
-                    logger.debug(f"Tweet data: in_reply_to_status_id={getattr(tweet, 'in_reply_to_status_id', None)}, "
-                                f"in_reply_to_user_id={getattr(tweet, 'in_reply_to_user_id', None)}, "
-                                f"in_reply_to_screen_name={getattr(tweet, 'in_reply_to_screen_name', None)}")
 
                 # Convert timestamp_ms to datetime
                 timestamp = None
@@ -224,7 +254,7 @@ async def get_notifications(
 
                 notification_data = {
                     "id": notif.id,
-                    "notification_type": notification_type.value,
+                    "notification_type": stream_type.value,
                     "timestamp": timestamp,
                     "message": getattr(notif, 'message', None),
                     "icon": getattr(notif, 'icon', {}),
@@ -239,6 +269,9 @@ async def get_notifications(
         logger.info(f"✅  Successfully fetched {len(processed_notifications)} notifications")
         return processed_notifications
 
+    except HTTPException:
+        # Upstream errors are already mapped, e.g. 429 with Retry-After
+        raise
     except Exception as e:
         logger.error(f"Failed to fetch notifications: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch notifications: {str(e)}") 
@@ -246,7 +279,9 @@ async def get_notifications(
 @router.get("/mentions", response_model=List[NotificationData])
 async def get_mention_notifications(
     limit: int = Query(default=40, ge=1, le=100, description="Number of notifications to retrieve"),
-    cursor: Optional[str] = Query(default=None, description="Cursor for pagination")
+    cursor: Optional[str] = Query(default=None, description="Cursor for pagination"),
+    incremental: bool = Query(default=False, description="Return only mentions newer than the previous incremental poll"),
+    reset: bool = Query(default=False, description="Forget the incremental position and start from the newest page")
 ):
     """
     Fetch only mention notifications from Twitter
@@ -257,32 +292,60 @@ async def get_mention_notifications(
         notification_type=NotificationType.MENTIONS,
         limit=limit,
         cursor=cursor,
-        include_mentions=False
+        include_mentions=False,
+        incremental=incremental,
+        reset=reset
     ) 
 
-@router.post("/", response_model=dict)
-async def process_notification(
-    notification: NotificationPayload = Body(...)
+@router.get("/debug/captured", response_model=NotificationCaptureStatus)
+async def get_captured_notifications(
+    limit: int = Query(default=50, ge=0, le=1000, description="Number of most recent captured notifications to return"),
+    clear: bool = Query(default=False, description="Empty the buffer after reading it")
 ):
-    """Process incoming notification about a tweet"""
+    """
+    Raw payloads of sampled notifications, kept in a bounded ring buffer
+    Sampling is off unless NOTIFICATION_CAPTURE_SAMPLE_RATE is set
+    """
+    status = notification_capture.status(limit)
+    if clear:
+        notification_capture.clear()
+    return status
+
+async def handle_notification(notification: NotificationPayload) -> dict:
+    """
+    Hydrate the tweet of a notification and record it as processed
+
+    Notifications that were already processed are skipped before any Twitter request.
+    reprocessed forces processing again; test_mode notifications are never recorded as processed.
+    Errors are raised to the caller.
+    """
+    check_duplicates = not (notification.test_mode or notification.reprocessed)
+    if check_duplicates and not await processed_index.claim(notification.id):
+        logger.info(f"⏭️  Notification for tweet {notification.id} was already processed, skipping")
+        return {
+            "status": "skipped",
+            "message": "Notification already processed",
+            "tweet_id": notification.id
+        }
+
+    recorded = False
     try:
         logger.info(f"📨 Received notification for tweet ID: {notification.id}")
         
-        async def get_tweet():
-            return await twitter_client.client.get_tweet_by_id(notification.id)
-            
-        if USE_TWITTER_MOCKS:
-            logger.warning("🚧 Twitter API calls are disabled in mock mode")
-            return {
-                "status": "success",
-                "message": "Mock mode - skipping Twitter API call",
-                "tweet_id": notification.id
-            }
-            
-        tweet = await handle_twitter_request(get_tweet)
-        if tweet:
-            tweet_details = process_tweet_details(tweet)
+        async def get_tweet(client):
+            return await client.get_tweet_by_id(notification.id)
             
+        tweet_details = tweet_cache.get(notification.id)
+        if not tweet_details:
+            tweet = await handle_twitter_request(get_tweet, 'get_tweet_by_id', coalesce_key=('get_tweet_by_id', notification.id))
+            if tweet:
+                tweet_details = process_tweet_details(tweet)
+                tweet_cache.set(tweet_details.id, tweet_details)
+
+        if tweet_details:
+            if not notification.test_mode:
+                await processed_index.mark_processed(notification.id)
+                recorded = True
             return {
                 "status": "success",
                 "message": "Notification processed successfully",
@@ -294,10 +357,56 @@ async def process_notification(
             "message": "Tweet not found",
             "tweet_id": notification.id
         }
-        
+    finally:
+        if check_duplicates and not recorded:
+            # Lets a later retry process it
+            await processed_index.release(notification.id)
+
+@router.post("/", response_model=dict)
+async def process_notification(
+    notification: NotificationPayload = Body(...)
+):
+    """Process incoming notification about a tweet"""
+    try:
+        return await handle_notification(notification)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to process notification: {str(e)}")
         raise HTTPException(
             status_code=500, 
             detail=f"Failed to process notification: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+@router.post("/batch", response_model=NotificationBatchResult)
+async def process_notification_batch(
+    notifications: List[NotificationPayload] = Body(..., max_length=NOTIFICATION_BATCH_MAX_SIZE)
+):
+    """
+    Process several notifications in one request
+
+    Tweets are fetched concurrently, at most NOTIFICATION_BATCH_CONCURRENCY at a time.
+    Every notification gets its own result in the same order; a failed notification
+    gets status "error" and does not fail the others.
+    """
+    logger.info(f"📨 Received batch of {len(notifications)} notifications")
+    semaphore = asyncio.Semaphore(NOTIFICATION_BATCH_CONCURRENCY)
+
+    async def process(notification: NotificationPayload) -> dict:
+        async with semaphore:
+            try:
+                return {"tweet_id": notification.id, **await handle_notification(notification)}
+            except ExecutionStopError:
+                raise
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.error(f"Failed to process notification {notification.id}: {detail}")
+                return {"tweet_id": notification.id, "status": "error", "message": f"Failed to process notification: {detail}"}
+
+    results = await asyncio.gather(*(process(notification) for notification in notifications))
+    return NotificationBatchResult(
+        results=results,
+        succeeded=sum(result["status"] == "success" for result in results),
+        skipped=sum(result["status"] == "skipped" for result in results),
+        failed=sum(result["status"] == "error" for result in results)
+    )
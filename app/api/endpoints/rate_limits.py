@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from pydantic import BaseModel
+from typing import List
+from app.api.common import get_twitter_pool
+from app.services.rate_limiter import rate_limiter, BucketStatus, TWITTER_RATE_LIMIT_MAX_WAIT
+from app.services.twitter_pool import AccountStatus
+
+router = APIRouter()
+
+class RateLimitsStatus(BaseModel):
+    max_wait: float
+    accounts: List[AccountStatus]
+    buckets: List[BucketStatus]
+
+@router.get("/", response_model=RateLimitsStatus)
+async def get_rate_limits():
+    """Get per-account, per-endpoint rate limit buckets and account load"""
+    return RateLimitsStatus(
+        max_wait=TWITTER_RATE_LIMIT_MAX_WAIT,
+        accounts=get_twitter_pool().status(),
+        buckets=rate_limiter.status()
+    )
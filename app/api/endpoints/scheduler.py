@@ -1,26 +1,92 @@
-from fastapi import APIRouter
-from app.api.scheduler import tweet_scheduler, SchedulerStartParams
+from fastapi import APIRouter, HTTPException, Query
+from typing import Dict, List, Optional
+from app.api.scheduler import job_scheduler, SchedulerStartParams, JobConfig, JobStatus
+from app.services.high_water_marks import high_water_marks
+from app.services.leader_election import leader_elector, LeaderStatus
+from app.services.scheduler_state import JobState
 from loguru import logger
 
 router = APIRouter()
 
+REQUESTED = "requested, the scheduler leader applies it on its next lease renewal"
+
+async def request_changes(changes: Dict[str, dict]) -> bool:
+    """Save job changes for the scheduler leader; True if this process is the leader and applied them"""
+    is_leader = leader_elector.is_leader
+    await job_scheduler.request(changes, run_jobs=is_leader)
+    return is_leader
+
 @router.post("/start")
 async def start_scheduler(
     params: SchedulerStartParams
 ):
-    """Start the tweet scheduler with specified minimum tweets parameter"""
+    """Start all enabled scheduler jobs with specified minimum tweets parameter"""
+    states = await job_scheduler.load_state()
+    enabled = [name for name, job in job_scheduler.jobs.items() if job.config.enabled]
+    started = [name for name in enabled if not states.get(name, JobState()).running]
+    if not started:
+        return {"status": "error", "message": "Scheduler is already running"}
     logger.info(f"Starting scheduler with minimum_tweets={params.minimum_tweets}")
-    if tweet_scheduler.start(minimum_tweets=params.minimum_tweets):
-        return {
-            "status": "success", 
-            "message": "Scheduler started",
-            "minimum_tweets": params.minimum_tweets
-        }
-    return {"status": "error", "message": "Scheduler is already running"}
+    applied = await request_changes({name: {"running": True, "minimum_tweets": params.minimum_tweets} for name in enabled})
+    return {
+        "status": "success",
+        "message": "Scheduler started" if applied else f"Scheduler start {REQUESTED}",
+        "minimum_tweets": params.minimum_tweets,
+        "jobs": started
+    }
 
 @router.post("/stop")
 async def stop_scheduler():
-    """Stop the tweet scheduler"""
-    if tweet_scheduler.stop():
-        return {"status": "success", "message": "Scheduler stopped"}
-    return {"status": "error", "message": "Scheduler is not running"} 
\ No newline at end of file
+    """Stop all scheduler jobs"""
+    states = await job_scheduler.load_state()
+    stopped = [name for name, state in states.items() if state.running]
+    if not stopped:
+        return {"status": "error", "message": "Scheduler is not running"}
+    applied = await request_changes({name: {"running": False} for name in stopped})
+    return {"status": "success", "message": "Scheduler stopped" if applied else f"Scheduler stop {REQUESTED}", "jobs": stopped}
+
+@router.get("/jobs", response_model=List[JobStatus])
+async def get_jobs():
+    """Configuration, state and run counters of every scheduler job"""
+    return job_scheduler.status()
+
+@router.post("/jobs", response_model=JobStatus)
+async def put_job(config: JobConfig):
+    """Add a job, or replace the job with the same name (restarting it if it was running), on every process"""
+    await request_changes({config.name: {"config": config.model_dump(mode="json")}})
+    return job_scheduler.jobs[config.name].status()
+
+@router.post("/jobs/{name}/start")
+async def start_job(name: str):
+    """Start one job, whether or not it is enabled"""
+    states = await job_scheduler.load_state()
+    if name not in job_scheduler.jobs:
+        raise HTTPException(status_code=404, detail=f"Job {name} not found")
+    if states.get(name, JobState()).running:
+        return {"status": "error", "message": f"Job {name} is already running"}
+    applied = await request_changes({name: {"running": True, "minimum_tweets": job_scheduler.jobs[name].config.minimum_tweets}})
+    return {"status": "success", "message": f"Job {name} started" if applied else f"Job {name} start {REQUESTED}"}
+
+@router.post("/jobs/{name}/stop")
+async def stop_job(name: str):
+    """Stop one job"""
+    states = await job_scheduler.load_state()
+    if name not in job_scheduler.jobs:
+        raise HTTPException(status_code=404, detail=f"Job {name} not found")
+    if not states.get(name, JobState()).running:
+        return {"status": "error", "message": f"Job {name} is not running"}
+    applied = await request_changes({name: {"running": False}})
+    return {"status": "success", "message": f"Job {name} stopped" if applied else f"Job {name} stop {REQUESTED}"}
+
+@router.get("/leader", response_model=LeaderStatus)
+async def get_leader():
+    """Whether this process holds the scheduler lease and runs scheduler jobs"""
+    return leader_elector.status()
+
+@router.post("/high_water_marks/reset")
+async def reset_high_water_marks(
+    source: Optional[str] = Query(default=None, description="Source to reset, e.g. latest_timeline or search:<query>; all if omitted")
+):
+    """Forget the newest ingested tweet IDs so the next cycle starts from the top again"""
+    await high_water_marks.reset(source)
+    return {"status": "success", "message": f"High-water marks reset for {source or 'all sources'}"}
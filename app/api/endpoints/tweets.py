@@ -1,41 +1,39 @@
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-import time
-from random import randint
 from datetime import datetime
-from app.models.schemas import SearchParams, TimelineParams, TweetData
-from app.api.common import twitter_client
-from app.api.utils import handle_twitter_request, ExecutionStopError, process_tweet_details
-from app.services.supabase import supabase
+from app.models.schemas import SearchParams, TimelineParams, TweetData, UpsertResult
+from app.api.common import get_twitter_client
+from app.api.utils import handle_twitter_request, ExecutionStopError, process_tweet_details, iterate_pages, crawl_replies
+from app.services.supabase import get_supabase, execute_query
+from app.services.cache import tweet_cache, CacheStats
+from app.services.metrics import UPSERT_BATCH_SIZE, UPSERTED_TWEETS
+from app.services.seen_tweets import seen_tweets, SeenTweetsStats
 import logging
 import random
 import asyncio
 import os
 import json
 from loguru import logger
-from app.api.scheduler import tweet_scheduler
+from app.api.action_queue import action_queue
 from pydantic import BaseModel
 from app.models.tweet_schemas import TweetThread, TweetDetails, CreateTweetRequest
 from app.api.utils.tweet_utils import process_tweet_details
 
 router = APIRouter()
 
-USE_TWITTER_MOCKS = os.getenv("USE_TWITTER_MOCKS", "false").lower() == "true"
-
-async def upsert_tweets_batch(tweets_data: List[TweetData]):
+async def upsert_tweets_batch(tweets_data: List[TweetData]) -> Optional[UpsertResult]:
     if not tweets_data:
         return None
         
     try:
         logger.info(f"🏋️‍♀️  Processing {len(tweets_data)} tweets...")
         
-        # Preparing data
-        db_tweets = []
-        tweet_ids = []
+        # Preparing data, keyed by tweet_id so duplicates in one batch collapse
         tweets_map = {}
         
         for tweet in tweets_data:
-            db_tweet = {
+            tweets_map[tweet.tweet_id] = {
                 "tweet_id": tweet.tweet_id,
                 "tweet_user_name": tweet.tweet_user_name,
                 "tweet_user_nick": tweet.tweet_user_nick,
@@ -44,76 +42,50 @@ async def upsert_tweets_batch(tweets_data: List[TweetData]):
                 "tweet_created_at_datetime": tweet.created_at,
                 "tweet_retweet_count": tweet.retweets,
                 "tweet_likes": tweet.likes,
-                "tweet_photo_urls": "{" + ",".join(f'"{url}"' for url in tweet.photo_urls) + "}" if tweet.photo_urls else None,
+                "tweet_photo_urls": tweet.photo_urls or None,
                 "tweet_lang": tweet.tweet_lang,
-                "tweet_view_count": 0
+                "tweet_view_count": tweet.views
             }
-            db_tweets.append(db_tweet)
-            tweet_ids.append(tweet.tweet_id)
-            tweets_map[tweet.tweet_id] = db_tweet
-            
-        # Getting existing tweets in one request
-        existing = supabase.table('tweets') \
-            .select('tweet_id') \
-            .in_('tweet_id', tweet_ids) \
-            .execute()
             
-        existing_ids = {tweet['tweet_id'] for tweet in existing.data}
-        
-        # Separating into new and updated tweets
-        tweets_to_insert = []
-        tweets_to_update = []
-        current_time = datetime.now().isoformat()
+        # Tweets stored earlier with the same counters and text need no write; the database
+        # skips the ones it finds unchanged too, but only after the round trip
+        changed_tweets = [tweet for tweet in tweets_map.values() if not seen_tweets.is_unchanged(tweet)]
+        unchanged = len(tweets_map) - len(changed_tweets)
+        UPSERTED_TWEETS.labels("unchanged").inc(unchanged)
+        if not changed_tweets:
+            logger.info(f"⏭️  All {unchanged} tweets are unchanged, nothing to write")
+            return UpsertResult(unchanged=unchanged)
+
+        # Inserting new and updating existing tweets in one statement
+        # (see sql/02_create_upsert_function.sql)
+        UPSERT_BATCH_SIZE.observe(len(changed_tweets))
+        response = await execute_query(
+            get_supabase().rpc('upsert_tweets', {'p_tweets': changed_tweets}),
+            'upsert_tweets'
+        )
+        for tweet in changed_tweets:
+            seen_tweets.remember(tweet)
         
-        for tweet in db_tweets:
-            if tweet['tweet_id'] in existing_ids:
-                tweets_to_update.append(tweet)
-            else:
-                tweet['first_seen_at'] = current_time
-                tweets_to_insert.append(tweet)
+        # Rows the database found unchanged are not returned
+        inserted_ids = {row['tweet_id'] for row in response.data if row['inserted']}
+        result = UpsertResult(
+            inserted=len(inserted_ids),
+            updated=len(response.data) - len(inserted_ids),
+            unchanged=unchanged + len(changed_tweets) - len(response.data)
+        )
+        UPSERTED_TWEETS.labels("inserted").inc(result.inserted)
+        UPSERTED_TWEETS.labels("updated").inc(result.updated)
+        UPSERTED_TWEETS.labels("unchanged").inc(result.unchanged - unchanged)
+        logger.info(f"💾  Inserted {result.inserted} new, updated {result.updated} and skipped {result.unchanged} unchanged tweets")
         
-        # Inserting new tweets in one batch
-        if tweets_to_insert:
-            supabase.table('tweets') \
-                .insert(tweets_to_insert) \
-                .execute()
-            logger.info(f"💾  Inserted {len(tweets_to_insert)} new tweets")
-            
-            max_likes_tweet = max(tweets_to_insert, key=lambda tweet: tweet['tweet_likes'], default=None)
-            if max_likes_tweet and not USE_TWITTER_MOCKS and random.randint(1, 3) == 1:
-                delay = random.randint(25, 35)
-                logger.info(f"⏳  Will try to like tweet {max_likes_tweet['tweet_id']} with {max_likes_tweet['tweet_likes']} likes in {delay} seconds...")
-                await asyncio.sleep(delay)
-                await favorite_tweet(max_likes_tweet['tweet_id'])
-
-        # Updating existing tweets in one batch
-        if tweets_to_update:
-            update_data = {}
-            for tweet in tweets_to_update:
-                tweet_id = tweet['tweet_id']
-                update_data[tweet_id] = {
-                    "tweet_user_name": tweet['tweet_user_name'],
-                    "tweet_user_nick": tweet['tweet_user_nick'],
-                    "tweet_text": tweet['tweet_text'],
-                    "tweet_full_text": tweet['tweet_full_text'],
-                    "tweet_created_at_datetime": tweet['tweet_created_at_datetime'],
-                    "tweet_retweet_count": tweet['tweet_retweet_count'],
-                    "tweet_likes": tweet['tweet_likes'],
-                    "tweet_photo_urls": tweet['tweet_photo_urls'],
-                    "tweet_lang": tweet['tweet_lang'],
-                    "tweet_view_count": tweet['tweet_view_count'],
-                    "updated_at": current_time
-                }
-            for tweet in tweets_to_update:
-                tweet_id = tweet['tweet_id']
-                supabase.table('tweets') \
-                    .update(update_data[tweet_id]) \
-                    .eq('tweet_id', tweet_id) \
-                    .execute()
-            logger.info(f"💾  Updated {len(tweets_to_update)} existing tweets")
+        tweets_inserted = [tweets_map[tweet_id] for tweet_id in inserted_ids]
+        max_likes_tweet = max(tweets_inserted, key=lambda tweet: tweet['tweet_likes'], default=None)
+        if max_likes_tweet and random.randint(1, 3) == 1:
+            logger.info(f"👍  Scheduling like for tweet {max_likes_tweet['tweet_id']} with {max_likes_tweet['tweet_likes']} likes")
+            await action_queue.enqueue("favorite", max_likes_tweet['tweet_id'])
                 
         logger.info(f"🎉  Successfully processed all {len(tweets_data)} tweets")
-        return True
+        return result
         
     except ExecutionStopError:
         raise
@@ -121,83 +93,72 @@ async def upsert_tweets_batch(tweets_data: List[TweetData]):
         logger.error(f"🚨 Error in batch processing tweets: {str(e)}")
         return None
 
-async def fetch_tweets_from_file():
-    with open('app/mocks/tweets.json') as f:
-        return json.load(f)
-
-async def get_tweets(params: SearchParams | TimelineParams):
-    if USE_TWITTER_MOCKS:
-        logger.info('🔎  Fetching tweets from mock file...')
-        return await fetch_tweets_from_file()
-    else:
-        logger.info('🔎  Fetching tweets from Twitter API...')
-        if isinstance(params, SearchParams):
-            return await twitter_client.client.search_tweet(params.query, product='Latest')
-        elif isinstance(params, TimelineParams):
-            # Split requests for timeline and latest_timeline
-            if getattr(params, 'is_latest', False):
-                return await twitter_client.client.get_latest_timeline()
-            else:
-                return await twitter_client.client.get_timeline()
+async def get_tweets(client, params: SearchParams | TimelineParams):
+    logger.info('🔎  Fetching tweets from Twitter API...')
+    if isinstance(params, SearchParams):
+        return await client.search_tweet(params.query, product='Latest')
+    elif isinstance(params, TimelineParams):
+        # Split requests for timeline and latest_timeline
+        if getattr(params, 'is_latest', False):
+            return await client.get_latest_timeline()
+        else:
+            return await client.get_timeline()
 
-@router.post("/search_tweets", response_model=List[TweetData])
-async def search_tweets(params: SearchParams):
+async def iterate_search_batches(params: SearchParams):
+    """Yield processed tweets page by page, saving each page to DB if requested"""
     tweet_count = 0
-    tweets = None
-    results = []
-    batch_size = 100
 
-    while tweet_count < params.minimum_tweets:
-        async def get_tweets_func():
-            nonlocal tweets
-            if tweets is None:
-                return await get_tweets(params)
-            else:
-                wait_time = randint(5, 10)
-                logger.info(f'⏳  Getting next tweets after {wait_time} seconds ...')
-                time.sleep(wait_time)
-                return await tweets.next()
+    async for page in iterate_pages(lambda client: get_tweets(client, params), 'search_tweet', params.minimum_tweets):
+        results = []
+        for tweet in page[:params.minimum_tweets - tweet_count]:
+            tweet_count += 1
+            results.append(get_twitter_client().process_tweet(tweet, tweet_count))
 
-        tweets = await handle_twitter_request(get_tweets_func)
-        if not tweets:
-            break
+        if params.save_to_db:
+            await upsert_tweets_batch([TweetData(**tweet_data) for tweet_data in results])
 
-        batch_tweets = []
-        for tweet in tweets:
-            tweet_count += 1
-            tweet_data = twitter_client.process_tweet(tweet, tweet_count)
-            results.append(tweet_data)
-            
-            if params.save_to_db:
-                batch_tweets.append(TweetData(**tweet_data))
-            
-            if params.save_to_db and (len(batch_tweets) >= batch_size or tweet_count >= params.minimum_tweets):
-                await upsert_tweets_batch(batch_tweets)
-                batch_tweets = []
-                
-            if tweet_count >= params.minimum_tweets:
-                break
-        
-        if params.save_to_db and batch_tweets:
-            await upsert_tweets_batch(batch_tweets)
+        yield results
 
-    return results
+async def stream_search_batches(first_batch, batches):
+    """Serialize search batches as NDJSON, flushing every page as soon as it is ready"""
+    try:
+        if first_batch:
+            yield "".join(TweetData(**tweet_data).model_dump_json() + "\n" for tweet_data in first_batch)
+        async for batch in batches:
+            yield "".join(TweetData(**tweet_data).model_dump_json() + "\n" for tweet_data in batch)
+    except ExecutionStopError:
+        raise
+    except Exception as e:
+        # Headers are already sent, so the stream can only be ended early
+        logger.error(f"🚨 Error while streaming search results: {str(e)}")
+
+@router.post("/search_tweets", response_model=List[TweetData])
+async def search_tweets(params: SearchParams):
+    batches = iterate_search_batches(params)
+
+    if not params.stream:
+        return [tweet_data async for batch in batches for tweet_data in batch]
+
+    # Fetch the first page before streaming so upstream errors still map to HTTP status codes
+    first_batch = await anext(batches, None)
+    return StreamingResponse(
+        stream_search_batches(first_batch, batches),
+        media_type="application/x-ndjson"
+    )
 
 @router.post("/timeline", response_model=List[TweetData])
 async def get_user_timeline(params: TimelineParams):
     logger.info("🔎  Fetching user timeline (For You)...")
     
-    async def get_timeline_tweets():
-        if USE_TWITTER_MOCKS:
-            return await fetch_tweets_from_file()
-        return await twitter_client.client.get_timeline()
+    async def get_timeline_tweets(client):
+        return await client.get_timeline()
 
-    tweets = await handle_twitter_request(get_timeline_tweets)
+    tweets = await handle_twitter_request(get_timeline_tweets, 'get_timeline', coalesce_key=('get_timeline',))
     results = []
     batch_tweets = []
 
     for i, tweet in enumerate(tweets[:params.minimum_tweets]):
-        tweet_data = twitter_client.process_tweet(tweet, i + 1)
+        tweet_data = get_twitter_client().process_tweet(tweet, i + 1)
         results.append(tweet_data)
         batch_tweets.append(TweetData(**tweet_data))
 
@@ -209,17 +170,15 @@ async def get_user_timeline(params: TimelineParams):
 async def get_latest_user_timeline(params: TimelineParams):
     logger.info("🔎  Fetching latest timeline (Following)...")
     
-    async def get_latest_timeline_tweets():
-        if USE_TWITTER_MOCKS:
-            return await fetch_tweets_from_file()
-        return await twitter_client.client.get_latest_timeline()
+    async def get_latest_timeline_tweets(client):
+        return await client.get_latest_timeline()
 
-    tweets = await handle_twitter_request(get_latest_timeline_tweets)
+    tweets = await handle_twitter_request(get_latest_timeline_tweets, 'get_latest_timeline', coalesce_key=('get_latest_timeline',))
     results = []
     batch_tweets = []
 
     for i, tweet in enumerate(tweets[:params.minimum_tweets]):
-        tweet_data = twitter_client.process_tweet(tweet, i + 1)
+        tweet_data = get_twitter_client().process_tweet(tweet, i + 1)
         results.append(tweet_data)
         batch_tweets.append(TweetData(**tweet_data))
 
@@ -229,23 +188,22 @@ async def get_latest_user_timeline(params: TimelineParams):
 
 @router.post("/favorite_tweet/{tweet_id}")
 async def favorite_tweet(tweet_id: int):
-    if USE_TWITTER_MOCKS:
-        logger.warning("🚧 Favorite tweet functionality is disabled in mock mode.")
-        raise HTTPException(status_code=403, detail="Favorite tweet functionality is disabled in mock mode.")
-    
     logger.info(f"🎯  Attempting to favorite tweet {tweet_id}")
     
-    async def do_favorite():
-        return await twitter_client.client.favorite_tweet(tweet_id)
+    async def do_favorite(client):
+        return await client.favorite_tweet(tweet_id)
     
     try:
-        result = await handle_twitter_request(do_favorite)
+        result = await handle_twitter_request(do_favorite, 'favorite_tweet', write=True)
         logger.info(f"💜  Successfully favorited tweet {tweet_id}")
+        tweet_cache.invalidate(str(tweet_id))
         
-        supabase.table('tweets') \
-            .update({"is_tweet_liked": True}) \
-            .eq('tweet_id', tweet_id) \
-            .execute()
+        await execute_query(
+            get_supabase().table('tweets')
+                .update({"is_tweet_liked": True})
+                .eq('tweet_id', tweet_id),
+            'update_tweet_liked'
+        )
         
         return {"status": "success", "tweet_id": tweet_id}
     except ExecutionStopError:
@@ -258,65 +216,24 @@ async def favorite_tweet(tweet_id: int):
 async def get_tweet_replies(
     tweet_id: str, 
     limit: int = Query(default=100, le=1000, description="Maximum number of replies to fetch"),
-    until_id: Optional[str] = Query(None, description="Collect replies until this tweet ID (inclusive)")
+    until_id: Optional[str] = Query(None, description="Collect replies until this tweet ID (inclusive), at most limit replies")
 ):
-    """Get replies for a specific tweet with pagination"""
+    """
+    Get replies for a specific tweet with pagination
+
+    replies is the flat list in the order Twitter returns them, conversation nests them by the reply they answer.
+    Crawled pages are kept for a few minutes, so a later call with a higher limit or until_id continues the crawl.
+    """
     logger.info(f"🔎  Fetching up to {limit} replies for tweet {tweet_id} (until_id={until_id})...")
     
-    if USE_TWITTER_MOCKS:
-        logger.warning("🚧 Getting replies functionality is not available in mock mode")
-        raise HTTPException(
-            status_code=403, 
-            detail="Getting replies functionality is not available in mock mode"
-        )
-    
-    async def get_replies():
-        # Get main tweet first
-        main_tweet = await twitter_client.client.get_tweet_by_id(tweet_id)
-        if not main_tweet:
-            raise HTTPException(status_code=404, detail="Tweet not found")
-            
-        main_tweet_details = process_tweet_details(main_tweet)
-        
-        # If tweet has no replies, return early
-        if not main_tweet.replies:
-            return TweetThread(main_tweet=main_tweet_details, replies=[])
-            
-        replies = []
-        max_pages = 5  # Limit the number of pages
-        page_count = 0
-        
-        # Get initial replies
-        current_replies = main_tweet.replies
-        while current_replies and len(replies) < limit and page_count < max_pages:
-            # Process current page of replies
-            for reply in current_replies[:limit - len(replies)]:
-                reply_details = process_tweet_details(reply)
-                replies.append(reply_details)
-                
-                # Check if we reached the until_id
-                if until_id and reply_details.id == until_id:
-                    return TweetThread(main_tweet=main_tweet_details, replies=replies)
-            
-            # Try to get next page
-            has_next = await current_replies.next() if current_replies else None
-            if len(replies) < limit and has_next:
-                page_count += 1
-                current_replies = await current_replies.next()
-            else:
-                break
-                    
-        return TweetThread(
-            main_tweet=main_tweet_details,
-            replies=replies[:limit]  # Cut to requested limit
-        )
-
     try:
-        result = await handle_twitter_request(get_replies)
+        result = await crawl_replies(tweet_id, limit, until_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Tweet not found")
         logger.info(f"✅  Successfully fetched main tweet and {len(result.replies)} replies")
         return result
         
-    except ExecutionStopError:
+    except (HTTPException, *ExecutionStopError):
         raise
     except Exception as e:
         logger.error(f"Failed to get replies for tweet {tweet_id}: {str(e)}")
@@ -325,66 +242,77 @@ async def get_tweet_replies(
 @router.post("/new", response_model=TweetDetails)
 async def create_tweet(request: CreateTweetRequest):
     """Create a new tweet, optionally as a reply to another tweet"""
-    if USE_TWITTER_MOCKS:
-        logger.warning("🚧 Creating tweets is disabled in mock mode")
-        raise HTTPException(
-            status_code=403, 
-            detail="Creating tweets is disabled in mock mode"
-        )
-    
     logger.info(f"📝 Creating new tweet{' as reply' if request.reply_to else ''}")
     
-    async def post_tweet():
+    async def post_tweet(client):
         # If this is a reply, we need to include reply parameters
         if request.reply_to:
-            # Get the original tweet to get its author info
-            original_tweet = await twitter_client.client.get_tweet_by_id(request.reply_to)
-            if not original_tweet:
-                raise HTTPException(status_code=404, detail="Reply target tweet not found")
-                
-            return await twitter_client.client.create_tweet(
+            return await client.create_tweet(
                 text=request.text,
                 reply_to=request.reply_to
             )
         else:
             # Regular tweet without reply
-            return await twitter_client.client.create_tweet(text=request.text)
+            return await client.create_tweet(text=request.text)
     
     try:
-        tweet = await handle_twitter_request(post_tweet)
+        if request.reply_to:
+            # Make sure the original tweet exists, unless it was looked up recently;
+            # a read of its own, so it takes a get_tweet_by_id token rather than a create_tweet one
+            original_tweet = tweet_cache.get(request.reply_to) or await handle_twitter_request(
+                lambda client: client.get_tweet_by_id(request.reply_to),
+                'get_tweet_by_id',
+                coalesce_key=('get_tweet_by_id', request.reply_to)
+            )
+            if not original_tweet:
+                raise HTTPException(status_code=404, detail="Reply target tweet not found")
+
+        tweet = await handle_twitter_request(post_tweet, 'create_tweet', write=True)
         tweet_details = process_tweet_details(tweet)
         logger.info(f"✅ Successfully posted tweet {tweet_details.id}")
+        if request.reply_to:
+            tweet_cache.invalidate(request.reply_to)
+        tweet_cache.set(tweet_details.id, tweet_details)
         
         return tweet_details
         
-    except ExecutionStopError:
+    except (HTTPException, *ExecutionStopError):
         raise
     except Exception as e:
         logger.error(f"Failed to create tweet: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/cache/stats", response_model=CacheStats)
+async def get_tweet_cache_stats():
+    """Get hit/miss counters of the tweet lookup cache"""
+    return tweet_cache.stats()
+
+@router.get("/seen/stats", response_model=SeenTweetsStats)
+async def get_seen_tweets_stats():
+    """Get the size of the seen-tweet index and how many unchanged tweets it kept from being written"""
+    return seen_tweets.stats()
+
 @router.get("/{tweet_id}", response_model=TweetDetails)
 async def get_tweet_by_id(tweet_id: str):
     """Get a tweet by its ID"""
+    cached_tweet = tweet_cache.get(tweet_id)
+    if cached_tweet:
+        logger.info(f"📦  Tweet {tweet_id} served from cache")
+        return cached_tweet
+
     logger.info(f"🔎  Fetching tweet with ID {tweet_id}...")
     
-    if USE_TWITTER_MOCKS:
-        logger.warning("🚧 Getting tweet functionality is not available in mock mode")
-        raise HTTPException(
-            status_code=403, 
-            detail="Getting tweet functionality is not available in mock mode"
-        )
-    
-    async def fetch_tweet():
-        tweet = await twitter_client.client.get_tweet_by_id(tweet_id)
-        if not tweet:
-            raise HTTPException(status_code=404, detail="Tweet not found")
-        return tweet
+    async def fetch_tweet(client):
+        return await client.get_tweet_by_id(tweet_id)
 
     try:
-        tweet_details = await handle_twitter_request(fetch_tweet)
-        logger.info(f"✅  Successfully fetched tweet {tweet_details.id}")
-        return process_tweet_details(tweet_details)
+        tweet = await handle_twitter_request(fetch_tweet, 'get_tweet_by_id', coalesce_key=('get_tweet_by_id', tweet_id))
+        if not tweet:
+            raise HTTPException(status_code=404, detail="Tweet not found")
+        logger.info(f"✅  Successfully fetched tweet {tweet.id}")
+        tweet_details = process_tweet_details(tweet)
+        tweet_cache.set(tweet_details.id, tweet_details)
+        return tweet_details
         
     except ExecutionStopError:
         raise
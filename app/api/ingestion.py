@@ -0,0 +1,89 @@
+import os
+from typing import Awaitable, Callable, List
+from fastapi import HTTPException
+from loguru import logger
+from app.api.common import get_twitter_client
+from app.api.endpoints.tweets import upsert_tweets_batch
+from app.api.utils import handle_twitter_request, iterate_pages
+from app.models.schemas import TweetData
+from app.services.high_water_marks import high_water_marks
+from app.services.supabase import get_supabase, execute_query
+
+# Most new tweets ingested from one source per cycle once it has a high-water mark
+INGEST_MAX_TWEETS = int(os.getenv("INGEST_MAX_TWEETS", "200"))
+
+async def ingest_new_tweets(
+    source: str,
+    fetch_first_page: Callable[..., Awaitable],
+    endpoint: str,
+    initial_tweets: int
+) -> List[dict]:
+    """
+    Fetch and save the tweets of a chronological source that are newer than its high-water mark
+
+    Pagination stops at the first page reaching already ingested tweets, and those are
+    dropped before any DB work. Without a mark yet, only initial_tweets are ingested.
+    Returns the processed new tweets.
+    """
+    mark = await high_water_marks.get(source)
+    max_items = initial_tweets if mark is None else INGEST_MAX_TWEETS
+    new_tweets = []
+    newest_id = 0
+
+    async for page in iterate_pages(fetch_first_page, endpoint, max_items):
+        page_tweets = list(page)
+        unseen = [tweet for tweet in page_tweets if mark is None or int(tweet.id) > mark]
+        for tweet in unseen[:max_items - len(new_tweets)]:
+            newest_id = max(newest_id, int(tweet.id))
+            new_tweets.append(get_twitter_client().process_tweet(tweet, len(new_tweets) + 1))
+        if len(unseen) < len(page_tweets):
+            break
+
+    # The mark only moves once the tweets are saved, so a failed save is retried next cycle
+    if new_tweets and await upsert_tweets_batch([TweetData(**tweet_data) for tweet_data in new_tweets]):
+        await high_water_marks.advance(source, newest_id)
+    logger.info(f"🌊  {source}: {len(new_tweets)} new tweets (previous mark {mark})")
+    return new_tweets
+
+async def ingest_latest_timeline(initial_tweets: int) -> List[dict]:
+    async def fetch_latest_timeline(client):
+        return await client.get_latest_timeline()
+
+    return await ingest_new_tweets('latest_timeline', fetch_latest_timeline, 'get_latest_timeline', initial_tweets)
+
+async def ingest_search(query: str, initial_tweets: int) -> List[dict]:
+    async def fetch_search(client):
+        return await client.search_tweet(query, product='Latest')
+
+    return await ingest_new_tweets(f'search:{query}', fetch_search, 'search_tweet', initial_tweets)
+
+async def refresh_tweet_metrics(limit: int) -> int:
+    """
+    Re-fetch the most recently stored tweets and save their current likes, retweets and views
+
+    Tweets that can no longer be fetched are skipped. Returns the number of refreshed tweets.
+    """
+    response = await execute_query(
+        get_supabase().table('tweets').select('tweet_id').order('created_at', desc=True).limit(limit),
+        'recent_tweets'
+    )
+    refreshed = []
+    for row in response.data:
+        tweet_id = row['tweet_id']
+        try:
+            tweet = await handle_twitter_request(
+                lambda client: client.get_tweet_by_id(tweet_id),
+                'get_tweet_by_id',
+                coalesce_key=('get_tweet_by_id', tweet_id)
+            )
+        except HTTPException as e:
+            if e.status_code != 400:
+                raise
+            logger.warning(f"⚠️  Could not refresh tweet {tweet_id}: {e.detail}")
+            continue
+        if tweet:
+            refreshed.append(TweetData(**get_twitter_client().process_tweet(tweet, len(refreshed) + 1)))
+
+    await upsert_tweets_batch(refreshed)
+    logger.info(f"📈  Refreshed metrics of {len(refreshed)} of {len(response.data)} recent tweets")
+    return len(refreshed)
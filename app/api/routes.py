@@ -2,9 +2,13 @@ from fastapi import APIRouter
 from app.api.endpoints import tweets
 from app.api.endpoints import scheduler
 from app.api.endpoints import notifications
+from app.api.endpoints import actions
+from app.api.endpoints import rate_limits
 
 router = APIRouter()
 
 router.include_router(tweets.router, prefix="/tweets", tags=["tweets"])
 router.include_router(scheduler.router, prefix="/scheduler", tags=["scheduler"])
-router.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
\ No newline at end of file
+router.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
+router.include_router(actions.router, prefix="/actions", tags=["actions"])
+router.include_router(rate_limits.router, prefix="/rate_limits", tags=["rate_limits"])
\ No newline at end of file
@@ -1,87 +1,326 @@
 import asyncio
-import logging
+import heapq
+import itertools
+import json
+import os
 import random
-from app.models.schemas import TimelineParams
+import time
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import Dict, List, Optional, Set
 from loguru import logger
-from app.api.common import twitter_client
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+from app.models.schemas import TimelineParams
+from app.services.metrics import SCHEDULER_JOB_DURATION, SCHEDULER_JOB_FAILURES, SCHEDULER_LAST_SUCCESS
+from app.services.scheduler_state import scheduler_state, JobState
+
+# JSON list of job configs used instead of the default jobs
+SCHEDULER_JOBS_FILE = os.getenv("SCHEDULER_JOBS_FILE")
+# Job runs executing at once across all jobs; waiting runs start by priority
+SCHEDULER_MAX_CONCURRENT_JOBS = int(os.getenv("SCHEDULER_MAX_CONCURRENT_JOBS", "2"))
+# Stream positions of the notifications job, separate from the API's incremental polling
+SCHEDULER_NOTIFICATION_STATE_FILE = os.getenv("SCHEDULER_NOTIFICATION_STATE_FILE", "scheduler_notification_state.json")
 
 class SchedulerStartParams(BaseModel):
     minimum_tweets: int = Field(default=10, ge=1, description="Minimum number of tweets to fetch in each request")
 
-class TweetScheduler:
-    def __init__(self):
-        self.task = None
-        self.is_running = False
-        self.minimum_tweets = 10
-
-    async def scheduled_tweets_fetch(self):
-        self.is_running = True
-        logger.info(f"🏁  Starting scheduled tweets fetch with minimum_tweets={self.minimum_tweets}...")
-        
-        while self.is_running:
+class JobType(str, Enum):
+    TIMELINE = "timeline"
+    LATEST_TIMELINE = "latest_timeline"
+    SEARCH = "search"
+    NOTIFICATIONS = "notifications"
+    METRICS_REFRESH = "metrics_refresh"
+
+class JobConfig(BaseModel):
+    name: str
+    type: JobType
+    interval: float = Field(gt=0, description="Seconds between runs")
+    jitter: float = Field(default=0, ge=0, description="Random seconds added to or removed from every interval")
+    priority: int = Field(default=0, description="Lower runs first when jobs wait for a free slot")
+    concurrency: int = Field(default=1, ge=1, description="Runs of this job allowed at the same time")
+    enabled: bool = Field(default=True, description="Started by /scheduler/start")
+    minimum_tweets: int = Field(default=10, ge=1, description="Tweets fetched by timeline jobs, or on the first run of latest_timeline and search jobs")
+    query: Optional[str] = Field(default=None, description="Query of search jobs")
+    limit: int = Field(default=40, ge=1, le=100, description="Notifications fetched per stream by notifications jobs, or tweets refreshed by metrics_refresh jobs")
+
+    @model_validator(mode="after")
+    def check_query(self):
+        if self.type == JobType.SEARCH and not self.query:
+            raise ValueError("search jobs need a query")
+        return self
+
+class JobStatus(BaseModel):
+    config: JobConfig
+    is_running: bool
+    active_runs: int
+    runs: int
+    failures: int
+    skipped: int
+    last_started_at: Optional[float] = None
+    last_success_at: Optional[float] = None
+    last_error: Optional[str] = None
+    next_run_at: Optional[float] = None
+
+# Same cadence as the former single loop, with the notifications job opt-in
+DEFAULT_JOBS = [
+    JobConfig(name="latest_timeline", type=JobType.LATEST_TIMELINE, interval=1800, jitter=120, priority=0),
+    JobConfig(name="timeline", type=JobType.TIMELINE, interval=1800, jitter=120, priority=1),
+    JobConfig(name="notifications", type=JobType.NOTIFICATIONS, interval=300, jitter=30, priority=0, enabled=False),
+    JobConfig(name="metrics_refresh", type=JobType.METRICS_REFRESH, interval=3600, jitter=300, priority=2, limit=20),
+]
+
+def load_job_configs() -> List[JobConfig]:
+    if not SCHEDULER_JOBS_FILE:
+        return [config.model_copy() for config in DEFAULT_JOBS]
+    with open(SCHEDULER_JOBS_FILE) as f:
+        return [JobConfig(**config) for config in json.load(f)]
+
+class PrioritySlots:
+    """Semaphore whose waiters are served lowest priority value first, then in arrival order"""
+
+    def __init__(self, limit: int):
+        self.available = limit
+        self.waiters = []
+        self.counter = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, priority: int):
+        if self.available > 0 and not self.waiters:
+            self.available -= 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            entry = (priority, next(self.counter), future)
+            heapq.heappush(self.waiters, entry)
             try:
-                # Try to ensure authentication
-                try:
-                    await twitter_client.ensure_authenticated()
-                except Exception as e:
-                    logger.error(f"Authentication failed: {str(e)}")
-                    await asyncio.sleep(32)  # Wait 32 seconds before retrying
-                    continue
-
-                params = TimelineParams(minimum_tweets=self.minimum_tweets)
-                logger.debug(f"Created TimelineParams with minimum_tweets={params.minimum_tweets}")
-                
-                # get tweets from following users
-                try:
-                    from app.api.endpoints.tweets import get_latest_user_timeline, get_user_timeline
-                    latest_tweets = await get_latest_user_timeline(params)
-                    logger.info(f"🎉  Scheduler: fetched {len(latest_tweets)} latest tweets")
-                except Exception as e:
-                    logger.error(f"Failed to fetch latest timeline: {str(e)}")
-                    await asyncio.sleep(60)
-                    continue
-                
-                # Random delay between requests (5-7 minutes)
-                delay_between_requests = random.randint(300, 420)
-                logger.info(f"⏳  Waiting {delay_between_requests} seconds before next request...")
-                await asyncio.sleep(delay_between_requests)
-                
-                # get recommended tweets
-                try:
-                    user_tweets = await get_user_timeline(params)
-                    logger.info(f"🎉  Scheduler: fetched {len(user_tweets)} user timeline tweets")
-                except Exception as e:
-                    logger.error(f"Failed to fetch user timeline: {str(e)}")
-                    await asyncio.sleep(60)
-                    continue
-
-            except Exception as e:
-                logger.error(f"Error in scheduled task: {str(e)}")
-                await asyncio.sleep(37)  # 37 seconds delay on error
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over right before the cancellation
+                    self._release()
+                else:
+                    self.waiters.remove(entry)
+                    heapq.heapify(self.waiters)
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.available += 1
+
+async def run_timeline(config: JobConfig):
+    from app.api.endpoints.tweets import get_user_timeline
+    tweets = await get_user_timeline(TimelineParams(minimum_tweets=config.minimum_tweets))
+    logger.info(f"🎉  Scheduler: fetched {len(tweets)} user timeline tweets")
+
+async def run_latest_timeline(config: JobConfig):
+    from app.api.ingestion import ingest_latest_timeline
+    tweets = await ingest_latest_timeline(config.minimum_tweets)
+    logger.info(f"🎉  Scheduler: fetched {len(tweets)} new latest tweets")
+
+async def run_search(config: JobConfig):
+    from app.api.ingestion import ingest_search
+    tweets = await ingest_search(config.query, config.minimum_tweets)
+    logger.info(f"🎉  Scheduler: fetched {len(tweets)} new tweets for '{config.query}'")
+
+# Created on the first notifications run, so importing the scheduler reads no state
+_notification_poll_state = None
+
+async def run_notifications(config: JobConfig):
+    """Poll new notifications and cache their tweets until the next poll, for POST /notifications/"""
+    global _notification_poll_state
+    from app.api.endpoints.notifications import fetch_notification_streams, NotificationType
+    from app.api.utils import process_tweet_details
+    from app.services.cache import tweet_cache
+    from app.services.notification_state import NotificationPollState
+
+    if _notification_poll_state is None:
+        _notification_poll_state = NotificationPollState(SCHEDULER_NOTIFICATION_STATE_FILE)
+    notifications = await fetch_notification_streams(NotificationType.ALL, config.limit, poll_state=_notification_poll_state)
+    # Kept until the next poll at the latest, however short TWEET_CACHE_TTL is
+    ttl = max(tweet_cache.ttl, config.interval + config.jitter)
+    for _, notif in notifications:
+        if getattr(notif, 'tweet', None):
+            tweet_details = process_tweet_details(notif.tweet)
+            tweet_cache.set(tweet_details.id, tweet_details, ttl=ttl)
+    logger.info(f"🔔  Scheduler: fetched {len(notifications)} new notifications")
+
+async def run_metrics_refresh(config: JobConfig):
+    from app.api.ingestion import refresh_tweet_metrics
+    await refresh_tweet_metrics(config.limit)
+
+JOB_RUNNERS = {
+    JobType.TIMELINE: run_timeline,
+    JobType.LATEST_TIMELINE: run_latest_timeline,
+    JobType.SEARCH: run_search,
+    JobType.NOTIFICATIONS: run_notifications,
+    JobType.METRICS_REFRESH: run_metrics_refresh,
+}
+
+class Job:
+    def __init__(self, config: JobConfig, slots: PrioritySlots):
+        self.config = config
+        self.slots = slots
+        self.task: Optional[asyncio.Task] = None
+        self.run_tasks: Set[asyncio.Task] = set()
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_started_at: Optional[float] = None
+        self.last_success_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.next_run_at: Optional[float] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    async def _loop(self):
+        # The first run is spread over the jitter, so jobs started together do not fire together
+        delay = random.uniform(0, self.config.jitter)
+        while True:
+            self.next_run_at = time.time() + delay
+            await asyncio.sleep(delay)
+            delay = max(0.0, self.config.interval + random.uniform(-self.config.jitter, self.config.jitter))
+
+            if len(self.run_tasks) >= self.config.concurrency:
+                self.skipped += 1
+                logger.warning(f"⏭️  Job {self.config.name} skipped, {len(self.run_tasks)} runs still in progress")
                 continue
-            
-            main_delay = random.randint(1680, 1920)  # 1800 ± 120 seconds
-            logger.info(f"⏳  Waiting {main_delay} seconds before next cycle...")
-            await asyncio.sleep(main_delay)
+            run_task = asyncio.create_task(self._run())
+            self.run_tasks.add(run_task)
+            run_task.add_done_callback(self.run_tasks.discard)
 
-    def start(self, minimum_tweets: int = 10):
-        if not self.is_running:
-            logger.info(f"Setting minimum_tweets to {minimum_tweets}")
-            self.minimum_tweets = minimum_tweets
-            self.task = asyncio.create_task(self.scheduled_tweets_fetch())
-            logger.info(f"🏁  Tweet scheduler started with minimum_tweets={minimum_tweets}")
-            return True
-        return False
-
-    def stop(self):
+    async def _run(self):
+        async with self.slots.slot(self.config.priority):
+            await self._execute()
+
+    async def _execute(self):
+        self.runs += 1
+        self.last_started_at = time.time()
+        started_at = time.perf_counter()
+        try:
+            await JOB_RUNNERS[self.config.type](self.config)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e) or type(e).__name__
+            SCHEDULER_JOB_FAILURES.labels(self.config.name).inc()
+            logger.error(f"Job {self.config.name} failed: {self.last_error}")
+            return
+        finally:
+            SCHEDULER_JOB_DURATION.labels(self.config.name).observe(time.perf_counter() - started_at)
+        self.last_success_at = time.time()
+        SCHEDULER_LAST_SUCCESS.labels(self.config.name).set(self.last_success_at)
+
+    def start(self) -> bool:
         if self.is_running:
-            self.is_running = False
-            if self.task:
-                self.task.cancel()
-            logger.info("🚧  Tweet scheduler stopped")
-            return True
-        return False
+            return False
+        self.task = asyncio.create_task(self._loop())
+        logger.info(f"🏁  Job {self.config.name} started, every {self.config.interval:.0f}±{self.config.jitter:.0f}s")
+        return True
+
+    def stop(self) -> bool:
+        if not self.is_running:
+            return False
+        self.task.cancel()
+        # Not running from now on, even before the cancellation is delivered
+        self.task = None
+        for run_task in list(self.run_tasks):
+            run_task.cancel()
+        logger.info(f"🚧  Job {self.config.name} stopped")
+        return True
+
+    def status(self) -> JobStatus:
+        return JobStatus(
+            config=self.config,
+            is_running=self.is_running,
+            active_runs=len(self.run_tasks),
+            runs=self.runs,
+            failures=self.failures,
+            skipped=self.skipped,
+            last_started_at=self.last_started_at,
+            last_success_at=self.last_success_at,
+            last_error=self.last_error,
+            next_run_at=self.next_run_at if self.is_running else None
+        )
+
+class JobScheduler:
+    """Runs every job on its own interval, sharing a limited number of run slots"""
+
+    def __init__(self, max_concurrent_jobs: int):
+        self.slots = PrioritySlots(max_concurrent_jobs)
+        self._jobs: Optional[Dict[str, Job]] = None
+        # Configs from the shared state already applied, by job name
+        self.applied_configs: Dict[str, dict] = {}
+
+    @property
+    def jobs(self) -> Dict[str, Job]:
+        # Configs are loaded on first use, so a bad jobs file fails the request, not the import
+        if self._jobs is None:
+            self._jobs = {config.name: Job(config, self.slots) for config in load_job_configs()}
+        return self._jobs
+
+    def stop(self) -> List[str]:
+        return [name for name, job in self.jobs.items() if job.stop()]
+
+    def put_job(self, config: JobConfig) -> bool:
+        """Add or replace a job; a replaced job that was running is restarted with the new config"""
+        previous = self.jobs.get(config.name)
+        was_running = previous.stop() if previous else False
+        self.jobs[config.name] = Job(config, self.slots)
+        if was_running:
+            self.jobs[config.name].start()
+        return was_running
+
+    def status(self) -> List[JobStatus]:
+        return [job.status() for job in self.jobs.values()]
+
+    def _apply(self, states: Dict[str, JobState], run_jobs: bool):
+        for name, state in states.items():
+            if state.config is not None and self.applied_configs.get(name) != state.config:
+                self.put_job(JobConfig(**state.config))
+                self.applied_configs[name] = state.config
+        if not run_jobs:
+            return
+        started, stopped = [], []
+        for name, job in self.jobs.items():
+            state = states.get(name, JobState())
+            if not state.running:
+                if job.stop():
+                    stopped.append(name)
+                continue
+            if state.minimum_tweets is not None:
+                job.config.minimum_tweets = state.minimum_tweets
+            if job.start():
+                started.append(name)
+        if started:
+            logger.info(f"▶️  Started scheduler jobs: {', '.join(started)}")
+        if stopped:
+            logger.info(f"⏹️  Stopped scheduler jobs: {', '.join(stopped)}")
+
+    async def load_state(self) -> Dict[str, JobState]:
+        """Job states requested by the operator, with the job configs of this process brought up to date"""
+        states = await scheduler_state.load()
+        self._apply(states, run_jobs=False)
+        return states
+
+    async def request(self, changes: Dict[str, dict], run_jobs: bool):
+        """
+        Save job changes (running, minimum_tweets or config by job name) to the shared state
+
+        run_jobs applies them right away; only the leader runs jobs, others leave that to its next reconcile.
+        """
+        self._apply(await scheduler_state.update(changes), run_jobs)
+
+    async def reconcile(self):
+        """Start and stop jobs to match the shared state, e.g. after another process changed it"""
+        self._apply(await scheduler_state.load(), run_jobs=True)
 
 # Create a global instance of the scheduler
-tweet_scheduler = TweetScheduler() 
\ No newline at end of file
+job_scheduler = JobScheduler(SCHEDULER_MAX_CONCURRENT_JOBS)
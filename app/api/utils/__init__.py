@@ -1,8 +1,15 @@
 from .tweet_utils import process_tweet_details
-from .base_utils import handle_twitter_request, ExecutionStopError
+from .base_utils import handle_twitter_request, execute_twitter_request, map_twitter_error, ExecutionStopError, current_twitter_account
+from .pagination_utils import iterate_pages
+from .reply_utils import crawl_replies
 
 __all__ = [
     'process_tweet_details',
     'handle_twitter_request',
-    'ExecutionStopError'
+    'execute_twitter_request',
+    'map_twitter_error',
+    'ExecutionStopError',
+    'current_twitter_account',
+    'iterate_pages',
+    'crawl_replies'
 ] 
\ No newline at end of file
@@ -1,32 +1,163 @@
 from fastapi import HTTPException
 import asyncio
+import contextvars
+import time
 from twikit import (
-    TooManyRequests, Unauthorized, TwitterException, 
-    BadRequest, Forbidden, NotFound, RequestTimeout, 
-    ServerError, AccountLocked
+    TooManyRequests, Unauthorized, TwitterException,
+    BadRequest, Forbidden, NotFound, RequestTimeout,
+    ServerError, AccountLocked, AccountSuspended
 )
-from app.api.common import twitter_client
+from app.api.common import get_twitter_pool
+from app.services.twitter import TwitterClient
+from app.services.rate_limiter import rate_limiter, RateLimitExceeded, resolve_max_wait, retry_after_header
+from app.services.singleflight import twitter_singleflight
+from app.services.metrics import TWITTER_REQUEST_DURATION, TWITTER_REQUEST_ERRORS
+from typing import Hashable, Optional
 from loguru import logger
 
 ExecutionStopError = (asyncio.CancelledError, KeyboardInterrupt, SystemError)
 
-async def handle_twitter_request(request_func):
-    """Generic handler for Twitter API requests with error handling and authentication"""
+class AuthenticationFailed(Exception):
+    pass
+
+# Account whose client request_func is running on, e.g. to keep paginating its results on it
+current_twitter_account: contextvars.ContextVar[Optional[TwitterClient]] = contextvars.ContextVar(
+    "current_twitter_account", default=None
+)
+
+async def call_on_account(request_func, account: TwitterClient):
+    token = current_twitter_account.set(account)
+    try:
+        return await request_func(account.client)
+    finally:
+        current_twitter_account.reset(token)
+
+async def execute_twitter_request(
+    request_func,
+    endpoint: str,
+    write: bool = False,
+    account: Optional[TwitterClient] = None,
+    deadline: Optional[float] = None
+):
+    """
+    Run request_func on an account from the pool and return its raw result
+
+    Reads move to another account when the current one is rate limited, cannot authenticate or is locked.
+    Upstream errors are raised as-is, so every caller can map them on its own.
+    """
+    deadline = deadline if deadline is not None else time.monotonic() + resolve_max_wait()
+    twitter_pool = get_twitter_pool()
+    excluded = []
+    while True:
+        current = twitter_pool.acquire(
+            write=write,
+            excluded=excluded,
+            pinned=account,
+            wait_time=lambda candidate: rate_limiter.wait_time(candidate.username, endpoint)
+        )
+        if current is None:
+            raise RateLimitExceeded(endpoint, 0)
+
+        try:
+            await rate_limiter.acquire(current.username, endpoint, deadline)
+            try:
+                try:
+                    authenticated = await current.ensure_authenticated()
+                except ExecutionStopError:
+                    raise
+                except Exception as e:
+                    raise AuthenticationFailed(str(e)) from e
+                if not authenticated:
+                    raise AuthenticationFailed(f"Authentication retries exhausted for {current.username}")
+                result = await call_on_account(request_func, current)
+            except Unauthorized:
+                # Try to re-authenticate once; other errors of the retried request are raised as-is
+                try:
+                    await current.authenticate()
+                except ExecutionStopError:
+                    raise
+                except Exception as e:
+                    raise AuthenticationFailed(str(e)) from e
+                try:
+                    result = await call_on_account(request_func, current)
+                except Unauthorized as e:
+                    raise AuthenticationFailed(str(e)) from e
+            current.mark_session_valid()
+            twitter_pool.mark_healthy(current)
+            return result
+        except TooManyRequests as e:
+            rate_limiter.on_rate_limited(
+                current.username, endpoint, getattr(e, 'rate_limit_reset', None), getattr(e, 'headers', None)
+            )
+            excluded.append(current)
+            if write or account or len(excluded) >= len(twitter_pool.accounts):
+                raise
+            logger.warning(f"Rate limit reached for {current.username}, retrying with another account")
+        except (AuthenticationFailed, AccountLocked, AccountSuspended) as e:
+            twitter_pool.mark_unhealthy(current, f"{type(e).__name__}: {str(e)}")
+            excluded.append(current)
+            if write or account or len(excluded) >= len(twitter_pool.accounts):
+                raise
+            logger.warning(f"{current.username} is unavailable, retrying with another account")
+        finally:
+            twitter_pool.release(current)
+
+def map_twitter_error(e: Exception) -> Optional[HTTPException]:
+    """Map an upstream error to the HTTP error returned to API clients, None if it is not an upstream error"""
+    if isinstance(e, RateLimitExceeded):
+        return HTTPException(status_code=429, detail="Rate limit reached", headers=retry_after_header(e.retry_after))
+    if isinstance(e, TooManyRequests):
+        reset_at = getattr(e, 'rate_limit_reset', None)
+        headers = retry_after_header(reset_at - time.time()) if reset_at else None
+        return HTTPException(status_code=429, detail="Rate limit reached", headers=headers)
+    if isinstance(e, AuthenticationFailed):
+        return HTTPException(status_code=401, detail=f"Authentication failed: {str(e)}")
+    if isinstance(e, (AccountLocked, BadRequest, Forbidden, NotFound, TwitterException)):
+        return HTTPException(status_code=400, detail=str(e))
+    if isinstance(e, (RequestTimeout, ServerError)):
+        return HTTPException(status_code=503, detail="Service temporarily unavailable")
+    return None
+
+async def handle_twitter_request(
+    request_func,
+    endpoint: str,
+    write: bool = False,
+    account: Optional[TwitterClient] = None,
+    max_wait: Optional[float] = None,
+    coalesce_key: Optional[Hashable] = None
+):
+    """
+    Generic handler for Twitter API requests with error handling and authentication
+
+    request_func receives the twikit client of the account picked from the pool;
+    current_twitter_account gives it the account itself.
+    Writes are pinned to the primary account; reads go to the account that can serve
+    the endpoint soonest and move to another one if the current account is rate limited.
+    Pass account to keep using a specific account (e.g. to paginate a result).
+
+    Every call takes a token from the per-account bucket of endpoint (the twikit method name),
+    queueing up to max_wait seconds (TWITTER_RATE_LIMIT_MAX_WAIT by default) before failing with 429.
+
+    Concurrent calls with the same coalesce_key share a single upstream request,
+    so the key must identify the method and all of its arguments.
+    """
+    deadline = time.monotonic() + resolve_max_wait(max_wait)
+
+    async def execute():
+        return await execute_twitter_request(request_func, endpoint, write=write, account=account, deadline=deadline)
+
+    started_at = time.perf_counter()
     try:
-        await twitter_client.ensure_authenticated()
-        return await request_func()
+        if coalesce_key is None:
+            return await execute()
+        return await twitter_singleflight.run(coalesce_key, execute)
     except ExecutionStopError:
         raise
-    except TooManyRequests:
-        raise HTTPException(status_code=429, detail="Rate limit reached")
-    except Unauthorized:
-        # Try to re-authenticate once
-        try:
-            await twitter_client.authenticate()
-            return await request_func()
-        except Exception as e:
-            raise HTTPException(status_code=401, detail=f"Authentication failed: {str(e)}")
-    except (AccountLocked, BadRequest, Forbidden, NotFound, TwitterException) as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except (RequestTimeout, ServerError):
-        raise HTTPException(status_code=503, detail="Service temporarily unavailable") 
\ No newline at end of file
+    except Exception as e:
+        http_error = map_twitter_error(e)
+        TWITTER_REQUEST_ERRORS.labels(endpoint, str(http_error.status_code) if http_error else "other").inc()
+        if http_error is None:
+            raise
+        raise http_error from e
+    finally:
+        TWITTER_REQUEST_DURATION.labels(endpoint).observe(time.perf_counter() - started_at)
@@ -0,0 +1,42 @@
+import asyncio
+import random
+from typing import AsyncIterator, Awaitable, Callable, Tuple
+from loguru import logger
+from .base_utils import handle_twitter_request, current_twitter_account
+
+async def iterate_pages(
+    fetch_first_page: Callable[..., Awaitable],
+    endpoint: str,
+    max_items: int,
+    delay_range: Tuple[float, float] = (5, 10)
+) -> AsyncIterator:
+    """
+    Async generator over paginated twikit results
+
+    Yields pages until max_items are collected or there is no next page,
+    waiting a random delay between page requests without blocking the event loop.
+    Next pages are requested on the same account that served the first one.
+    """
+    account = None
+
+    async def fetch_first(client):
+        nonlocal account
+        account = current_twitter_account.get()
+        return await fetch_first_page(client)
+
+    page = await handle_twitter_request(fetch_first, endpoint)
+    item_count = 0
+
+    while page:
+        yield page
+        item_count += len(page)
+
+        if item_count >= max_items or not hasattr(page, 'next'):
+            return
+
+        wait_time = random.uniform(*delay_range)
+        logger.info(f'⏳  Getting next page after {wait_time:.1f} seconds ...')
+        await asyncio.sleep(wait_time)
+
+        current_page = page
+        page = await handle_twitter_request(lambda client: current_page.next(), endpoint, account=account)
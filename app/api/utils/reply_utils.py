@@ -0,0 +1,138 @@
+import asyncio
+import os
+from typing import Dict, List, Optional, Set
+from loguru import logger
+from app.models.tweet_schemas import ConversationNode, TweetDetails, TweetThread
+from app.services.cache import TTLCache, tweet_cache
+from app.services.twitter import TwitterClient
+from .base_utils import handle_twitter_request, current_twitter_account
+from .tweet_utils import process_tweet_details
+
+# Reply pages fetched per request, on top of the first page that comes with the tweet
+MAX_REPLY_PAGES = int(os.getenv("MAX_REPLY_PAGES", "5"))
+# How long a crawled conversation is kept so later requests can resume it
+REPLY_CRAWL_TTL = float(os.getenv("REPLY_CRAWL_TTL", "300"))  # seconds
+REPLY_CRAWL_CACHE_SIZE = int(os.getenv("REPLY_CRAWL_CACHE_SIZE", "200"))
+
+def has_next_page(page) -> bool:
+    return bool(page) and bool(getattr(page, 'next_cursor', None))
+
+class ConversationCrawl:
+    """Replies collected so far for one tweet, and where to continue"""
+
+    def __init__(self, main_tweet: TweetDetails, first_page, account: Optional[TwitterClient]):
+        self.main_tweet = main_tweet
+        self.replies: List[TweetDetails] = []
+        self.reply_ids: Set[str] = set()
+        self.account = account
+        self.fetched_page = first_page  # latest page fetched, its next() continues the crawl
+        self.unprocessed_page = first_page  # fetched page whose replies are not collected yet
+        self.prefetch: Optional[asyncio.Task] = None  # fetch of the page after fetched_page
+        self.lock = asyncio.Lock()
+
+    def is_satisfied(self, limit: int, until_id: Optional[str]) -> bool:
+        # limit caps the crawl even when until_id is not reached yet
+        return len(self.replies) >= limit or bool(until_id and until_id in self.reply_ids)
+
+    def _page_satisfies(self, page, limit: int, until_id: Optional[str]) -> bool:
+        if len(self.replies) + len(page) >= limit:
+            return True
+        return bool(until_id and any(str(reply.id) == until_id for reply in page))
+
+    def _start_prefetch(self):
+        page = self.fetched_page
+        # Reply pages come from TweetDetail, the upstream endpoint behind get_tweet_by_id, so they share its quota
+        self.prefetch = asyncio.create_task(handle_twitter_request(
+            lambda client: page.next(), 'get_tweet_by_id', account=self.account
+        ))
+        # A prefetch nobody awaits (crawl evicted) must not log an unretrieved exception
+        self.prefetch.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def _next_page(self):
+        """Next unprocessed page, fetched now or by the prefetch; None when there are no more replies"""
+        if self.unprocessed_page is not None:
+            page, self.unprocessed_page = self.unprocessed_page, None
+            return page
+        if self.prefetch is None:
+            if not has_next_page(self.fetched_page):
+                return None
+            self._start_prefetch()
+        # Cleared first, so a failed fetch is retried by the next request
+        prefetch, self.prefetch = self.prefetch, None
+        self.fetched_page = await prefetch
+        return self.fetched_page
+
+    async def extend(self, limit: int, until_id: Optional[str]):
+        """Collect reply pages until the request is satisfied, fetching every page exactly once"""
+        pages = 0
+        while not self.is_satisfied(limit, until_id) and pages <= MAX_REPLY_PAGES:
+            page = await self._next_page()
+            if not page:
+                break
+            pages += 1
+
+            # Fetch the following page while this one is processed, unless this one is enough
+            if self.prefetch is None and has_next_page(page) and not self._page_satisfies(page, limit, until_id):
+                self._start_prefetch()
+
+            for reply in page:
+                reply_details = process_tweet_details(reply)
+                tweet_cache.set(reply_details.id, reply_details)
+                if reply_details.id not in self.reply_ids:
+                    self.reply_ids.add(reply_details.id)
+                    self.replies.append(reply_details)
+
+    def thread(self, limit: int, until_id: Optional[str]) -> TweetThread:
+        replies = self.replies
+        if until_id and until_id in self.reply_ids:
+            replies = replies[:next(i for i, reply in enumerate(replies) if reply.id == until_id) + 1]
+        replies = replies[:limit]
+        return TweetThread(main_tweet=self.main_tweet, replies=replies, conversation=build_conversation(self.main_tweet.id, replies))
+
+def build_conversation(root_id: str, replies: List[TweetDetails]) -> List[ConversationNode]:
+    """Nest replies under the reply they answer; replies to the root or to unknown tweets are top level"""
+    nodes: Dict[str, ConversationNode] = {reply.id: ConversationNode(tweet=reply) for reply in replies}
+    roots = []
+    for reply in replies:
+        parent_id = reply.in_reply_to or reply.in_reply_to_status_id
+        parent = nodes.get(parent_id) if parent_id != root_id else None
+        if parent is not None and parent is not nodes[reply.id]:
+            parent.replies.append(nodes[reply.id])
+        else:
+            roots.append(nodes[reply.id])
+    return roots
+
+# Conversations crawled recently, keyed by the ID of the main tweet
+reply_crawl_cache = TTLCache(REPLY_CRAWL_CACHE_SIZE, REPLY_CRAWL_TTL)
+
+async def crawl_replies(tweet_id: str, limit: int, until_id: Optional[str] = None) -> Optional[TweetThread]:
+    """
+    Replies of tweet_id as a flat list and as a conversation tree, None if the tweet does not exist
+
+    Continues a recent crawl of the same tweet when there is one, so increasing limit
+    or a later until_id only fetches the pages that were not fetched yet.
+    """
+    crawl = reply_crawl_cache.get(tweet_id)
+    if crawl is None:
+        async def get_main_tweet(client):
+            return await client.get_tweet_by_id(tweet_id), current_twitter_account.get()
+
+        main_tweet, account = await handle_twitter_request(
+            get_main_tweet, 'get_tweet_by_id', coalesce_key=('get_tweet_replies', tweet_id)
+        )
+        if not main_tweet:
+            return None
+
+        main_tweet_details = process_tweet_details(main_tweet)
+        tweet_cache.set(main_tweet_details.id, main_tweet_details)
+        # A concurrent request may have started the same crawl while this one waited
+        crawl = reply_crawl_cache.get(tweet_id)
+        if crawl is None:
+            crawl = ConversationCrawl(main_tweet_details, main_tweet.replies, account)
+            reply_crawl_cache.set(tweet_id, crawl)
+    else:
+        logger.info(f"♻️  Resuming reply crawl of tweet {tweet_id} with {len(crawl.replies)} replies")
+
+    async with crawl.lock:
+        await crawl.extend(limit, until_id)
+        return crawl.thread(limit, until_id)
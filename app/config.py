@@ -1,4 +1,5 @@
 import os
+import json
 from functools import lru_cache
 from dotenv import load_dotenv
 
@@ -10,4 +11,16 @@ def get_twitter_credentials():
         'username': os.getenv('TWITTER_USERNAME'),
         'email': os.getenv('TWITTER_EMAIL'),
         'password': os.getenv('TWITTER_PASSWORD')
-    }
\ No newline at end of file
+    }
+
+@lru_cache()
+def get_twitter_accounts():
+    """
+    Additional accounts used to spread read traffic, loaded from the JSON file in TWITTER_ACCOUNTS_FILE:
+    [{"username": "...", "email": "...", "password": "...", "cookies_file": "cookies_2.json"}]
+    """
+    accounts_file = os.getenv('TWITTER_ACCOUNTS_FILE')
+    if not accounts_file:
+        return []
+    with open(accounts_file) as f:
+        return json.load(f)
@@ -1,16 +1,82 @@
-from fastapi import FastAPI
+import time
+
+# Measured from the very first import so the startup budget includes loading all modules
+_import_started_at = time.perf_counter()
+
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from app.api.routes import router
-from app.api.scheduler import tweet_scheduler
+from app.api.endpoints import health, metrics
+from app.api.scheduler import job_scheduler
+from app.api.action_queue import action_queue
+from app.services.supabase import shutdown_executor
+from app.services.processed_index import processed_index
+from app.services.seen_tweets import seen_tweets
+from app.services.leader_election import leader_elector
+from app.services.rate_limiter import request_max_wait
 from loguru import logger
 
-app = FastAPI()
-app.include_router(router, prefix="/api")
+# Import plus startup time above which a warning is logged
+STARTUP_TIME_BUDGET = float(os.getenv("STARTUP_TIME_BUDGET", "2.0"))  # seconds
+
+IMPORT_TIME = time.perf_counter() - _import_started_at
+
+async def on_elected():
+    action_queue.start()
+    await action_queue.take_handed_over()
+    await job_scheduler.reconcile()
+
+async def on_renewed():
+    # Picks up job changes and actions from the processes that are not the leader
+    await action_queue.take_handed_over()
+    await job_scheduler.reconcile()
 
-@app.on_event("startup")
-async def startup_event():
+async def on_demoted():
+    job_scheduler.stop()
+    action_queue.stop()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_started_at = time.perf_counter()
     logger.info("Starting up the application...")
+    seen_tweets.start_seeding()
+    # With several workers or replicas only the lease holder runs scheduler jobs and deferred actions
+    await leader_elector.start(on_elected=on_elected, on_demoted=on_demoted, on_renewed=on_renewed)
+
+    app.state.import_time = IMPORT_TIME
+    app.state.startup_time = time.perf_counter() - startup_started_at
+    total_time = app.state.import_time + app.state.startup_time
+    logger.info(f"🚀  Imported in {app.state.import_time:.3f}s, started in {app.state.startup_time:.3f}s")
+    if total_time > STARTUP_TIME_BUDGET:
+        logger.warning(f"🐢  Startup took {total_time:.3f}s, over the {STARTUP_TIME_BUDGET:.1f}s budget")
+
+    yield
 
-@app.on_event("shutdown")
-async def shutdown_event():
     logger.info("Shutting down the application...")
-    tweet_scheduler.stop() 
\ No newline at end of file
+    await leader_elector.stop()
+    job_scheduler.stop()
+    action_queue.stop()
+    seen_tweets.stop()
+    shutdown_executor()
+    processed_index.close()
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(router, prefix="/api")
+app.include_router(health.router, tags=["health"])
+app.include_router(metrics.router, tags=["metrics"])
+
+@app.middleware("http")
+async def rate_limit_wait_middleware(request: Request, call_next):
+    """Let callers choose how long to queue for Twitter rate limits via X-Rate-Limit-Max-Wait (seconds)"""
+    max_wait = request.headers.get("X-Rate-Limit-Max-Wait")
+    if max_wait is None:
+        return await call_next(request)
+    try:
+        token = request_max_wait.set(max(float(max_wait), 0.0))
+    except ValueError:
+        return await call_next(request)
+    try:
+        return await call_next(request)
+    finally:
+        request_max_wait.reset(token)
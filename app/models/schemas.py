@@ -3,8 +3,9 @@ from typing import List
 
 class SearchParams(BaseModel):
     query: str
-    minimum_tweets: int = 100
+    minimum_tweets: int = Field(default=100, ge=1, le=1000)
     save_to_db: bool = Field(default=False)
+    stream: bool = Field(default=False, description="Stream results as NDJSON, one tweet per line, page by page")
 
 class TimelineParams(BaseModel):
     minimum_tweets: int = 10
@@ -18,4 +19,10 @@ class TweetData(BaseModel):
     retweets: int
     likes: int
     photo_urls: List[str]
-    tweet_lang: str 
\ No newline at end of file
+    tweet_lang: str 
+    views: int = 0
+
+class UpsertResult(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0  # known tweets skipped without a database write
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -23,9 +23,15 @@ class TweetDetails(BaseModel):
     in_reply_to: Optional[str] = None
     photo_urls: List[str] = []
 
+class ConversationNode(BaseModel):
+    tweet: TweetDetails
+    replies: List["ConversationNode"] = Field(default_factory=list)
+
 class TweetThread(BaseModel):
     main_tweet: TweetDetails
-    replies: List[TweetDetails] 
+    replies: List[TweetDetails]
+    # The same replies nested under the tweet they answer
+    conversation: List[ConversationNode] = Field(default_factory=list)
 
 class CreateTweetRequest(BaseModel):
     text: str
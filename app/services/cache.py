@@ -0,0 +1,78 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from pydantic import BaseModel
+from app.services.metrics import TWEET_CACHE_ENTRIES
+
+TWEET_CACHE_TTL = float(os.getenv("TWEET_CACHE_TTL", "120"))  # seconds
+TWEET_CACHE_SIZE = int(os.getenv("TWEET_CACHE_SIZE", "2000"))
+
+class CacheStats(BaseModel):
+    size: int
+    max_size: int
+    ttl: float
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+class TTLCache:
+    """In-process LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store value for ttl seconds, the cache's own ttl by default"""
+        if self.max_size <= 0:
+            return
+        self.entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        if self.entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            size=len(self.entries),
+            max_size=self.max_size,
+            ttl=self.ttl,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            invalidations=self.invalidations
+        )
+
+# Processed TweetDetails keyed by tweet ID
+tweet_cache = TTLCache(TWEET_CACHE_SIZE, TWEET_CACHE_TTL)
+TWEET_CACHE_ENTRIES.set_function(lambda: len(tweet_cache.entries))
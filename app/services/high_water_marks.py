@@ -0,0 +1,40 @@
+import asyncio
+import os
+from typing import Dict, Optional
+from app.services.state_store import load_json_state, save_json_state
+
+HIGH_WATER_MARKS_FILE = os.getenv("HIGH_WATER_MARKS_FILE", "high_water_marks.json")
+
+class HighWaterMarks:
+    """Newest tweet ID ingested from each chronological source, persisted between cycles and restarts"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.marks: Optional[Dict[str, int]] = None
+
+    async def _load(self) -> Dict[str, int]:
+        if self.marks is None:
+            data = await asyncio.to_thread(load_json_state, self.path, {})
+            self.marks = {source: int(tweet_id) for source, tweet_id in data.items()}
+        return self.marks
+
+    async def get(self, source: str) -> Optional[int]:
+        return (await self._load()).get(source)
+
+    async def advance(self, source: str, tweet_id: int):
+        marks = await self._load()
+        if tweet_id > marks.get(source, 0):
+            marks[source] = tweet_id
+            # Saved as strings, like tweet IDs everywhere else
+            await save_json_state(self.path, {source: str(mark) for source, mark in marks.items()})
+
+    async def reset(self, source: Optional[str] = None):
+        marks = await self._load()
+        if source is None:
+            marks.clear()
+        else:
+            marks.pop(source, None)
+        await save_json_state(self.path, {source: str(mark) for source, mark in marks.items()})
+
+# Create a global instance for the scheduler
+high_water_marks = HighWaterMarks(HIGH_WATER_MARKS_FILE)
@@ -0,0 +1,195 @@
+import asyncio
+import fcntl
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+from loguru import logger
+from pydantic import BaseModel
+from app.services.supabase import get_supabase, execute_query
+
+# none: every process runs its own scheduler; file: flock on LEADER_LOCK_FILE (one host); supabase: row lease (any number of hosts)
+LEADER_ELECTION = os.getenv("LEADER_ELECTION", "none").lower()
+LEADER_LOCK_FILE = os.getenv("LEADER_LOCK_FILE", "scheduler.lock")
+LEADER_LEASE_TTL = float(os.getenv("LEADER_LEASE_TTL", "30"))  # seconds
+LEADER_RENEW_INTERVAL = float(os.getenv("LEADER_RENEW_INTERVAL", "10"))  # seconds
+LEADER_LEASE_NAME = "scheduler"
+
+class LeaderStatus(BaseModel):
+    mode: str
+    holder: str
+    is_leader: bool
+    lease_ttl: float
+    renew_interval: float
+
+class FileLease:
+    """Exclusive flock on a file; the OS drops it when the holding process exits, even on a crash"""
+
+    def __init__(self, path: str, holder: str):
+        self.path = path
+        self.holder = holder
+        self.fd: Optional[int] = None
+
+    async def acquire(self) -> bool:
+        if self.fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        # For humans only: which process holds the lock
+        os.ftruncate(fd, 0)
+        os.write(fd, self.holder.encode())
+        self.fd = fd
+        return True
+
+    async def release(self):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+class SupabaseLease:
+    """Row in scheduler_leases (sql/03_create_scheduler_lease.sql) held until it expires unless renewed"""
+
+    def __init__(self, name: str, holder: str, ttl: float):
+        self.name = name
+        self.holder = holder
+        self.ttl = ttl
+
+    async def acquire(self) -> bool:
+        """Take the lease if it is free or expired, or renew it if we already hold it"""
+        response = await execute_query(
+            get_supabase().rpc('acquire_lease', {'p_name': self.name, 'p_holder': self.holder, 'p_ttl_seconds': int(self.ttl)}),
+            'acquire_lease'
+        )
+        return bool(response.data)
+
+    async def release(self):
+        await execute_query(
+            get_supabase().rpc('release_lease', {'p_name': self.name, 'p_holder': self.holder}),
+            'release_lease'
+        )
+
+class LeaderElector:
+    """
+    Keeps trying to take or renew the scheduler lease and reports transitions
+
+    Without a lease (LEADER_ELECTION=none) the process is always the leader.
+    If renewing fails, leadership is kept only while the last renewed lease cannot have expired.
+    """
+
+    def __init__(self, mode: str, lease_ttl: float, renew_interval: float):
+        self.mode = mode
+        self.lease_ttl = lease_ttl
+        self.renew_interval = renew_interval
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        if mode == "file":
+            self.lease = FileLease(LEADER_LOCK_FILE, self.holder)
+        elif mode == "supabase":
+            self.lease = SupabaseLease(LEADER_LEASE_NAME, self.holder, lease_ttl)
+        elif mode == "none":
+            self.lease = None
+        else:
+            raise ValueError(f"Unknown LEADER_ELECTION mode: {mode}")
+        if mode == "supabase" and renew_interval >= lease_ttl:
+            raise ValueError("LEADER_RENEW_INTERVAL must be shorter than LEADER_LEASE_TTL")
+        self.is_leader = self.lease is None
+        self.valid_until = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.on_elected: Optional[Callable[[], Awaitable]] = None
+        self.on_demoted: Optional[Callable[[], Awaitable]] = None
+        self.on_renewed: Optional[Callable[[], Awaitable]] = None
+
+    async def _campaign(self):
+        while True:
+            # Measured before the call, so our view of the lease never outlives the database's
+            attempted_at = time.monotonic()
+            try:
+                acquired = await self.lease.acquire()
+                if acquired:
+                    self.valid_until = attempted_at + self.lease_ttl
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"🚨 Failed to renew the scheduler lease: {str(e)}")
+                # Step down before the next attempt would find the lease already expired
+                acquired = self.is_leader and time.monotonic() + self.renew_interval < self.valid_until
+            was_leader = self.is_leader
+            await self._set_leader(acquired)
+            if acquired and was_leader:
+                await self._run_callback(self.on_renewed)
+            await asyncio.sleep(self.renew_interval)
+
+    async def _set_leader(self, is_leader: bool):
+        if is_leader == self.is_leader:
+            return
+        self.is_leader = is_leader
+        if is_leader:
+            logger.info(f"👑  {self.holder} is now the scheduler leader")
+            callback = self.on_elected
+        else:
+            logger.warning(f"🪑  {self.holder} lost the scheduler lease")
+            callback = self.on_demoted
+        await self._run_callback(callback)
+
+    @staticmethod
+    async def _run_callback(callback: Optional[Callable[[], Awaitable]]):
+        if callback is None:
+            return
+        try:
+            await callback()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"🚨 Scheduler leadership callback failed: {str(e)}")
+
+    async def start(
+        self,
+        on_elected: Callable[[], Awaitable],
+        on_demoted: Callable[[], Awaitable],
+        on_renewed: Optional[Callable[[], Awaitable]] = None
+    ):
+        """
+        Start campaigning for the lease; callbacks run when this process becomes or stops being the leader,
+        and on_renewed every time the leader renews it
+
+        Without a lease the process is the leader right away, so on_elected runs before this returns.
+        """
+        if self.task is not None:
+            return
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.on_renewed = on_renewed
+        if self.lease is None:
+            logger.info("👑  No leader election, this process runs the scheduler")
+            await self._run_callback(on_elected)
+            return
+        self.task = asyncio.create_task(self._campaign())
+
+    async def stop(self):
+        """Give up the lease so another process can take over without waiting for it to expire"""
+        if self.task is None:
+            return
+        self.task.cancel()
+        self.task = None
+        await self._set_leader(False)
+        try:
+            await self.lease.release()
+        except Exception as e:
+            logger.error(f"🚨 Failed to release the scheduler lease: {str(e)}")
+
+    def status(self) -> LeaderStatus:
+        return LeaderStatus(
+            mode=self.mode,
+            holder=self.holder,
+            is_leader=self.is_leader,
+            lease_ttl=self.lease_ttl,
+            renew_interval=self.renew_interval
+        )
+
+# Create a global instance for the scheduler
+leader_elector = LeaderElector(LEADER_ELECTION, LEADER_LEASE_TTL, LEADER_RENEW_INTERVAL)
@@ -0,0 +1,82 @@
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+# Upstream Twitter calls, labelled by twikit method
+TWITTER_REQUEST_DURATION = Histogram(
+    "twemate_twitter_request_duration_seconds",
+    "Duration of Twitter requests, including rate-limit queueing and re-authentication",
+    ["endpoint"]
+)
+TWITTER_REQUEST_ERRORS = Counter(
+    "twemate_twitter_request_errors_total",
+    "Failed Twitter requests by the HTTP status they were mapped to",
+    ["endpoint", "status"]
+)
+
+# Authentication
+TWITTER_AUTH_ATTEMPTS = Counter(
+    "twemate_twitter_auth_attempts_total",
+    "Authentication attempts (session check, then login if needed)",
+    ["account", "result"]
+)
+TWITTER_LOGINS = Counter(
+    "twemate_twitter_logins_total",
+    "Full logins with credentials, after the saved session was rejected",
+    ["account"]
+)
+
+# Database
+SUPABASE_QUERY_DURATION = Histogram(
+    "twemate_supabase_query_duration_seconds",
+    "Duration of Supabase queries, including waiting for a worker thread",
+    ["query"]
+)
+UPSERT_BATCH_SIZE = Histogram(
+    "twemate_upsert_batch_size",
+    "Number of tweets per upsert batch",
+    buckets=(1, 5, 10, 20, 50, 100, 200, 500, 1000)
+)
+UPSERTED_TWEETS = Counter(
+    "twemate_upserted_tweets_total",
+    "Upserted tweets by outcome",
+    ["result"]
+)
+
+# Scheduler
+SCHEDULER_JOB_DURATION = Histogram(
+    "twemate_scheduler_job_duration_seconds",
+    "Duration of scheduler job runs",
+    ["job"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 900)
+)
+SCHEDULER_JOB_FAILURES = Counter(
+    "twemate_scheduler_job_failures_total",
+    "Scheduler job runs that failed",
+    ["job"]
+)
+SCHEDULER_LAST_SUCCESS = Gauge(
+    "twemate_scheduler_last_success_timestamp_seconds",
+    "Unix time of the last scheduler job run that completed without errors",
+    ["job"]
+)
+
+# In-process state, read when /metrics is scraped (set_function is registered next to each instance)
+TWEET_CACHE_ENTRIES = Gauge("twemate_tweet_cache_entries", "Entries in the tweet lookup cache")
+SEEN_TWEETS_ENTRIES = Gauge("twemate_seen_tweets_entries", "Tweets in the seen-tweet index")
+ACTION_QUEUE_DEPTH = Gauge("twemate_action_queue_depth", "Deferred actions waiting to run")
+
+class RateLimitTokensCollector:
+    """Tokens left in every rate-limit bucket, one sample per account and endpoint at scrape time"""
+
+    def __init__(self, bucket_statuses):
+        self.bucket_statuses = bucket_statuses
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            "twemate_rate_limit_tokens",
+            "Tokens left in the rate-limit bucket of an account and endpoint",
+            labels=["account", "endpoint"]
+        )
+        for bucket in self.bucket_statuses():
+            family.add_metric([bucket.account or "", bucket.endpoint], bucket.tokens)
+        yield family
@@ -0,0 +1,58 @@
+import os
+import random
+import time
+from collections import deque
+from typing import Iterable, List
+from pydantic import BaseModel
+from app.services.twitter_recorder import serialize_notification
+
+# Share of fetched notifications whose raw payload is kept for debugging, 0 disables capture
+NOTIFICATION_CAPTURE_SAMPLE_RATE = float(os.getenv("NOTIFICATION_CAPTURE_SAMPLE_RATE", "0"))
+NOTIFICATION_CAPTURE_SIZE = int(os.getenv("NOTIFICATION_CAPTURE_SIZE", "200"))
+
+class CapturedNotification(BaseModel):
+    captured_at: float
+    notification_type: str
+    payload: dict
+
+class NotificationCaptureStatus(BaseModel):
+    sample_rate: float
+    max_size: int
+    size: int
+    captured: int
+    items: List[CapturedNotification]
+
+class NotificationCapture:
+    """Bounded ring buffer with a sample of raw notification payloads"""
+
+    def __init__(self, max_size: int, sample_rate: float):
+        self.sample_rate = sample_rate
+        self.items = deque(maxlen=max_size)
+        self.captured = 0
+
+    def capture(self, notification_type: str, notifications: Iterable):
+        if self.sample_rate <= 0:
+            return
+        for notif in notifications:
+            if random.random() < self.sample_rate:
+                self.items.append(CapturedNotification(
+                    captured_at=time.time(),
+                    notification_type=notification_type,
+                    payload=serialize_notification(notif)
+                ))
+                self.captured += 1
+
+    def clear(self):
+        self.items.clear()
+
+    def status(self, limit: int) -> NotificationCaptureStatus:
+        return NotificationCaptureStatus(
+            sample_rate=self.sample_rate,
+            max_size=self.items.maxlen,
+            size=len(self.items),
+            captured=self.captured,
+            items=list(self.items)[-limit:] if limit else []
+        )
+
+# Create a global instance for notifications fetched from Twitter
+notification_capture = NotificationCapture(NOTIFICATION_CAPTURE_SIZE, NOTIFICATION_CAPTURE_SAMPLE_RATE)
@@ -0,0 +1,46 @@
+import asyncio
+import os
+from typing import Dict, Optional
+from pydantic import BaseModel
+from app.services.state_store import load_json_state, save_json_state
+
+NOTIFICATION_STATE_FILE = os.getenv("NOTIFICATION_STATE_FILE", "notification_state.json")
+
+class StreamPosition(BaseModel):
+    # Timestamp of the newest notification seen, polls page back until they reach it
+    newest_timestamp_ms: int = 0
+
+class NotificationPollState:
+    """Newest-seen position of each notification stream, persisted between polls and restarts"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.positions: Optional[Dict[str, StreamPosition]] = None
+        # Incremental polls run one at a time so concurrent pollers do not both get the same items
+        self.lock = asyncio.Lock()
+
+    async def _load(self) -> Dict[str, StreamPosition]:
+        if self.positions is None:
+            data = await asyncio.to_thread(load_json_state, self.path, {})
+            self.positions = {stream: StreamPosition(**position) for stream, position in data.items()}
+        return self.positions
+
+    async def get(self, stream: str) -> StreamPosition:
+        return (await self._load()).get(stream, StreamPosition())
+
+    async def reset(self, stream: str):
+        (await self._load()).pop(stream, None)
+
+    async def advance(self, stream: str, newest_timestamp_ms: int):
+        positions = await self._load()
+        position = positions.get(stream, StreamPosition())
+        positions[stream] = StreamPosition(
+            newest_timestamp_ms=max(position.newest_timestamp_ms, newest_timestamp_ms)
+        )
+
+    async def save(self):
+        positions = await self._load()
+        await save_json_state(self.path, {stream: position.model_dump() for stream, position in positions.items()})
+
+# Create a global instance for GET /notifications/?incremental=true
+notification_poll_state = NotificationPollState(NOTIFICATION_STATE_FILE)
@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from loguru import logger
+
+PROCESSED_INDEX_FILE = os.getenv("PROCESSED_INDEX_FILE", "processed_notifications.sqlite3")
+# Expected number of processed IDs; the Bloom filter keeps a 1% false-positive rate up to it
+PROCESSED_INDEX_CAPACITY = int(os.getenv("PROCESSED_INDEX_CAPACITY", "100000"))
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+# Seconds after which a claim that was neither released nor recorded can be taken over
+PROCESSED_INDEX_CLAIM_TIMEOUT = float(os.getenv("PROCESSED_INDEX_CLAIM_TIMEOUT", "300"))
+
+class BloomFilter:
+    """Bit array answering "definitely not added" or "maybe added" without touching the disk"""
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+        # Double hashing: k positions derived from two independent hashes
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class ProcessedIndex:
+    """
+    Durable set of processed notification IDs, stored in SQLite
+
+    A claim inserts a pending row, so only one worker of any process sharing the file gets it.
+    Repeats of processed IDs are rejected after a read when the Bloom filter knows them.
+    """
+
+    def __init__(self, path: str, capacity: int, claim_timeout: float):
+        self.path = path
+        self.capacity = capacity
+        self.claim_timeout = claim_timeout
+        self.connection: Optional[sqlite3.Connection] = None
+        self.bloom: Optional[BloomFilter] = None
+        self.db_lock = threading.Lock()
+        self.open_lock = asyncio.Lock()
+
+    def _open(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # processed_at is the claim time of pending rows
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS processed_notifications ("
+            "tweet_id TEXT PRIMARY KEY, processed_at REAL NOT NULL, status TEXT NOT NULL DEFAULT 'done')"
+        )
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(processed_notifications)")}
+        if "status" not in columns:
+            with connection:
+                connection.execute("ALTER TABLE processed_notifications ADD COLUMN status TEXT NOT NULL DEFAULT 'done'")
+        bloom = BloomFilter(self.capacity, BLOOM_FALSE_POSITIVE_RATE)
+        count = 0
+        for (tweet_id,) in connection.execute("SELECT tweet_id FROM processed_notifications WHERE status = 'done'"):
+            bloom.add(tweet_id)
+            count += 1
+        logger.info(f"🗂️  Loaded {count} processed notification IDs from {self.path}")
+        self.connection, self.bloom = connection, bloom
+
+    async def _ensure_open(self):
+        if self.connection is None:
+            async with self.open_lock:
+                if self.connection is None:
+                    await asyncio.to_thread(self._open)
+
+    def _is_done(self, tweet_id: str) -> bool:
+        with self.db_lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM processed_notifications WHERE tweet_id = ? AND status = 'done'", (tweet_id,)
+            ).fetchone()
+        return row is not None
+
+    def _claim(self, tweet_id: str) -> bool:
+        now = time.time()
+        with self.db_lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO processed_notifications (tweet_id, processed_at, status) VALUES (?, ?, 'pending')",
+                (tweet_id, now)
+            )
+            if cursor.rowcount:
+                return True
+            # Take over a claim whose worker died without releasing it
+            cursor = self.connection.execute(
+                "UPDATE processed_notifications SET processed_at = ? "
+                "WHERE tweet_id = ? AND status = 'pending' AND processed_at < ?",
+                (now, tweet_id, now - self.claim_timeout)
+            )
+            return cursor.rowcount > 0
+
+    def _delete_pending(self, tweet_id: str):
+        with self.db_lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM processed_notifications WHERE tweet_id = ? AND status = 'pending'", (tweet_id,)
+            )
+
+    def _mark_done(self, tweet_id: str):
+        with self.db_lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO processed_notifications (tweet_id, processed_at, status) VALUES (?, ?, 'done') "
+                "ON CONFLICT (tweet_id) DO UPDATE SET processed_at = excluded.processed_at, status = 'done'",
+                (tweet_id, time.time())
+            )
+
+    async def claim(self, tweet_id: str) -> bool:
+        """Reserve tweet_id for processing, False if it was already processed or is being processed"""
+        await self._ensure_open()
+        if tweet_id in self.bloom and await asyncio.to_thread(self._is_done, tweet_id):
+            return False
+        return await asyncio.to_thread(self._claim, tweet_id)
+
+    async def release(self, tweet_id: str):
+        """Give up a claim without recording it, e.g. after processing failed"""
+        await self._ensure_open()
+        await asyncio.to_thread(self._delete_pending, tweet_id)
+
+    async def mark_processed(self, tweet_id: str):
+        await self._ensure_open()
+        await asyncio.to_thread(self._mark_done, tweet_id)
+        self.bloom.add(tweet_id)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+# Create a global instance for POST /notifications/
+processed_index = ProcessedIndex(PROCESSED_INDEX_FILE, PROCESSED_INDEX_CAPACITY, PROCESSED_INDEX_CLAIM_TIMEOUT)
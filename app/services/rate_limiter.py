@@ -0,0 +1,194 @@
+import asyncio
+import contextvars
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from pydantic import BaseModel
+from prometheus_client import REGISTRY
+from app.services.metrics import RateLimitTokensCollector
+
+# Twitter rate limits are counted per account and endpoint over 15-minute windows
+RATE_LIMIT_WINDOW = 15 * 60
+
+# Initial quotas per window; they are adjusted from the rate-limit errors we get back
+DEFAULT_RATE_LIMITS = {
+    "search_tweet": 50,
+    "get_timeline": 500,
+    "get_latest_timeline": 500,
+    "get_tweet_by_id": 150,
+    "get_notifications": 180,
+    "favorite_tweet": 500,
+    "create_tweet": 300,
+}
+DEFAULT_RATE_LIMIT = 50
+
+# Learned from counting calls, a capacity grows by this share back towards its default every window without a 429
+RATE_LIMIT_REGROWTH = 0.1
+
+# How long a request may queue for a rate-limit token before failing with 429
+TWITTER_RATE_LIMIT_MAX_WAIT = float(os.getenv("TWITTER_RATE_LIMIT_MAX_WAIT", "30"))
+
+# Per-request override of the maximum wait, set from the X-Rate-Limit-Max-Wait header
+request_max_wait: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_max_wait", default=None)
+
+class RateLimitExceeded(Exception):
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"Rate limit for {endpoint} would be available in {retry_after:.0f} seconds")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+class BucketStatus(BaseModel):
+    account: Optional[str]  # None for the mock and replay clients, which have no username
+    endpoint: str
+    capacity: int
+    tokens: float
+    is_learned: bool
+    blocked_until: Optional[float] = None
+    calls_in_window: int
+
+class TokenBucket:
+    """Token bucket refilled evenly over the rate-limit window"""
+
+    def __init__(self, capacity: int, window: int = RATE_LIMIT_WINDOW):
+        self.default_capacity = capacity
+        self.capacity = capacity
+        self.window = window
+        self.tokens = float(capacity)
+        self.updated_at = time.time()
+        self.blocked_until = 0.0
+        self.window_started_at = self.updated_at
+        self.calls_in_window = 0
+        # Calls are only counted over a whole window once we have seen one start
+        self.window_observed = False
+        self.is_learned = False
+        self.limit_from_headers = False
+
+    def _refill(self):
+        now = time.time()
+        if self.blocked_until:
+            if now < self.blocked_until:
+                return
+            # The upstream window has been reset
+            self.blocked_until = 0.0
+            self.tokens = float(self.capacity)
+            self.updated_at = now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.capacity / self.window)
+        self.updated_at = now
+        if now - self.window_started_at >= self.window:
+            if self.is_learned and not self.limit_from_headers and self.capacity < self.default_capacity:
+                # A whole window passed without a 429, so the counted capacity may have been too low
+                self.capacity = min(self.default_capacity, math.ceil(self.capacity * (1 + RATE_LIMIT_REGROWTH)))
+            self.window_started_at = now
+            self.calls_in_window = 0
+            self.window_observed = True
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available"""
+        self._refill()
+        if self.blocked_until:
+            return self.blocked_until - time.time()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.window / self.capacity
+
+    def consume(self):
+        self._refill()
+        self.tokens -= 1
+        self.calls_in_window += 1
+
+    def on_rate_limited(self, reset_at: Optional[float], limit: Optional[int] = None):
+        """
+        Block until the upstream reset and learn the quota
+
+        The x-rate-limit-limit header is used when present. Otherwise the quota is estimated
+        from the calls made in this window, but only if the whole window was observed:
+        after a restart mid-window the calls made before it are unknown.
+        """
+        if limit:
+            self.capacity = limit
+            self.is_learned = True
+            self.limit_from_headers = True
+        elif self.window_observed and 1 < self.calls_in_window and self.calls_in_window - 1 < self.capacity:
+            self.capacity = self.calls_in_window - 1
+            self.is_learned = True
+        self.tokens = 0.0
+        self.blocked_until = reset_at or time.time() + self.window
+        # The next window starts at the reset, and we see it from its beginning
+        self.window_started_at = self.blocked_until
+        self.calls_in_window = 0
+        self.window_observed = True
+
+class RateLimiter:
+    """Per-account, per-endpoint token buckets around upstream Twitter calls"""
+
+    def __init__(self):
+        self.buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def bucket(self, account: str, endpoint: str) -> TokenBucket:
+        key = (account, endpoint)
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(DEFAULT_RATE_LIMITS.get(endpoint, DEFAULT_RATE_LIMIT))
+        return self.buckets[key]
+
+    def wait_time(self, account: str, endpoint: str) -> float:
+        return self.bucket(account, endpoint).wait_time()
+
+    async def acquire(self, account: str, endpoint: str, deadline: float):
+        """Wait for a token until the deadline (time.monotonic based), else raise RateLimitExceeded"""
+        bucket = self.bucket(account, endpoint)
+        while True:
+            wait_time = bucket.wait_time()
+            if wait_time <= 0:
+                bucket.consume()
+                return
+            if time.monotonic() + wait_time > deadline:
+                raise RateLimitExceeded(endpoint, wait_time)
+            logger.info(f"⏳  Waiting {wait_time:.1f} seconds for {endpoint} rate limit ({account})...")
+            await asyncio.sleep(wait_time)
+
+    def on_rate_limited(self, account: str, endpoint: str, reset_at: Optional[float], headers: Optional[dict] = None):
+        """Record a 429; headers are the upstream response headers, if known"""
+        bucket = self.bucket(account, endpoint)
+        bucket.on_rate_limited(reset_at, parse_rate_limit(headers))
+        logger.warning(f"🚦  {endpoint} rate limited for {account}, capacity {bucket.capacity}, "
+                       f"blocked for {max(bucket.blocked_until - time.time(), 0):.0f} seconds")
+
+    def status(self) -> List[BucketStatus]:
+        statuses = []
+        for (account, endpoint), bucket in self.buckets.items():
+            bucket._refill()
+            statuses.append(BucketStatus(
+                account=account,
+                endpoint=endpoint,
+                capacity=bucket.capacity,
+                tokens=round(bucket.tokens, 2),
+                is_learned=bucket.is_learned,
+                blocked_until=bucket.blocked_until or None,
+                calls_in_window=bucket.calls_in_window
+            ))
+        return statuses
+
+def parse_rate_limit(headers: Optional[dict]) -> Optional[int]:
+    """Quota per window from the x-rate-limit-limit response header"""
+    if not headers:
+        return None
+    value = {name.lower(): value for name, value in headers.items()}.get("x-rate-limit-limit")
+    try:
+        return int(value) if value is not None and int(value) > 0 else None
+    except (TypeError, ValueError):
+        return None
+
+def resolve_max_wait(max_wait: Optional[float] = None) -> float:
+    if max_wait is not None:
+        return max_wait
+    override = request_max_wait.get()
+    return override if override is not None else TWITTER_RATE_LIMIT_MAX_WAIT
+
+def retry_after_header(retry_after: float) -> dict:
+    return {"Retry-After": str(math.ceil(max(retry_after, 0)))}
+
+# Create a global instance of the rate limiter
+rate_limiter = RateLimiter()
+REGISTRY.register(RateLimitTokensCollector(rate_limiter.status))
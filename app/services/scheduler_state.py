@@ -0,0 +1,118 @@
+import asyncio
+import os
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+from app.services.leader_election import LEADER_ELECTION
+from app.services.state_store import load_json_state, write_json_atomic, locked_state
+from app.services.supabase import get_supabase, execute_query
+
+# What the operator asked of each job, applied by whichever process is the scheduler leader
+SCHEDULER_STATE_FILE = os.getenv("SCHEDULER_STATE_FILE", "scheduler_state.json")
+# Deferred actions found by processes that do not run the action queue, handed to the leader
+ACTION_INBOX_FILE = os.getenv("ACTION_INBOX_FILE", "action_inbox.json")
+
+class JobState(BaseModel):
+    running: bool = False
+    minimum_tweets: Optional[int] = None
+    # Set by POST /scheduler/jobs, replaces the job's config on every process
+    config: Optional[dict] = None
+
+class FileSchedulerState:
+    """Job states saved in a JSON file, shared by the processes of one host"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _read(self) -> Dict[str, JobState]:
+        return {name: JobState(**state) for name, state in load_json_state(self.path, {}).items()}
+
+    def _update(self, changes: Dict[str, dict]) -> Dict[str, JobState]:
+        with locked_state(self.path):
+            states = self._read()
+            for name, fields in changes.items():
+                states[name] = states.get(name, JobState()).model_copy(update=fields)
+            write_json_atomic(self.path, {name: state.model_dump() for name, state in states.items()})
+        return states
+
+    async def load(self) -> Dict[str, JobState]:
+        # Read on every call: another process may have changed it since
+        return await asyncio.to_thread(self._read)
+
+    async def update(self, changes: Dict[str, dict]) -> Dict[str, JobState]:
+        """Merge changed fields per job name and return every job state"""
+        return await asyncio.to_thread(self._update, changes)
+
+class SupabaseSchedulerState:
+    """Job states saved in the scheduler_jobs table (sql/03_create_scheduler_lease.sql), shared by every host"""
+
+    async def load(self) -> Dict[str, JobState]:
+        response = await execute_query(
+            get_supabase().table('scheduler_jobs').select('name, running, minimum_tweets, config'),
+            'load_scheduler_jobs'
+        )
+        return {row['name']: JobState(**{key: value for key, value in row.items() if key != 'name'}) for row in response.data}
+
+    async def update(self, changes: Dict[str, dict]) -> Dict[str, JobState]:
+        """Merge changed fields per job name and return every job state"""
+        # One row per job, so concurrent changes to different jobs do not overwrite each other
+        for name, fields in changes.items():
+            await execute_query(
+                get_supabase().table('scheduler_jobs').upsert({'name': name, **fields}),
+                'save_scheduler_job'
+            )
+        return await self.load()
+
+class FileActionInbox:
+    """Deferred actions handed over through a JSON file, shared by the processes of one host"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _push(self, action: dict):
+        with locked_state(self.path):
+            actions = load_json_state(self.path, [])
+            if not any(item['action'] == action['action'] and item['tweet_id'] == action['tweet_id'] for item in actions):
+                actions.append(action)
+                write_json_atomic(self.path, actions)
+
+    def _take(self) -> List[dict]:
+        with locked_state(self.path):
+            actions = load_json_state(self.path, [])
+            if actions:
+                write_json_atomic(self.path, [])
+        return actions
+
+    async def push(self, action: dict):
+        await asyncio.to_thread(self._push, action)
+
+    async def take(self) -> List[dict]:
+        """Remove and return every handed over action"""
+        return await asyncio.to_thread(self._take)
+
+class SupabaseActionInbox:
+    """Deferred actions handed over through the deferred_actions table (sql/03_create_scheduler_lease.sql)"""
+
+    async def push(self, action: dict):
+        await execute_query(
+            get_supabase().table('deferred_actions').upsert(action, on_conflict='action,tweet_id', ignore_duplicates=True),
+            'push_deferred_action'
+        )
+
+    async def take(self) -> List[dict]:
+        """Remove and return every handed over action"""
+        response = await execute_query(get_supabase().table('deferred_actions').select('*'), 'load_deferred_actions')
+        for action in {row['action'] for row in response.data}:
+            tweet_ids = [row['tweet_id'] for row in response.data if row['action'] == action]
+            await execute_query(
+                get_supabase().table('deferred_actions').delete().eq('action', action).in_('tweet_id', tweet_ids),
+                'delete_deferred_actions'
+            )
+        return response.data
+
+# Create global instances, stored next to the lease
+if LEADER_ELECTION == "supabase":
+    scheduler_state = SupabaseSchedulerState()
+    action_inbox = SupabaseActionInbox()
+else:
+    scheduler_state = FileSchedulerState(SCHEDULER_STATE_FILE)
+    action_inbox = FileActionInbox(ACTION_INBOX_FILE)
@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Optional
+from loguru import logger
+from pydantic import BaseModel
+from app.services.metrics import SEEN_TWEETS_ENTRIES
+from app.services.supabase import get_supabase, execute_query
+
+SEEN_TWEETS_SIZE = int(os.getenv("SEEN_TWEETS_SIZE", "50000"))
+# Rows per seeding query; PostgREST caps every response at its max-rows setting (1000 by default)
+SEEN_TWEETS_SEED_PAGE_SIZE = int(os.getenv("SEEN_TWEETS_SEED_PAGE_SIZE", "1000"))
+
+# Columns rewritten when a stored tweet changes, the same as in sql/02_create_upsert_function.sql
+MUTABLE_TWEET_COLUMNS = (
+    "tweet_text",
+    "tweet_full_text",
+    "tweet_retweet_count",
+    "tweet_likes",
+    "tweet_view_count",
+)
+
+def tweet_fingerprint(row: dict) -> bytes:
+    """Hash of the mutable columns of a tweets row, equal for the payload we write and the row we read back"""
+    values = [row.get(column) for column in MUTABLE_TWEET_COLUMNS]
+    return hashlib.blake2b(json.dumps(values, default=str).encode(), digest_size=8).digest()
+
+class SeenTweetsStats(BaseModel):
+    size: int
+    max_size: int
+    seeded: int
+    unchanged_skipped: int
+
+class SeenTweetIndex:
+    """
+    Bounded LRU of tweet IDs known to be stored, with the fingerprint of what was last written
+
+    Tweets whose fingerprint matches are unchanged and need no database write.
+    Unknown IDs are uncertain and always go to the database.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.fingerprints: "OrderedDict[str, bytes]" = OrderedDict()
+        self.seeded = 0
+        self.unchanged_skipped = 0
+        self.seed_task: Optional[asyncio.Task] = None
+
+    def is_unchanged(self, row: dict) -> bool:
+        fingerprint = self.fingerprints.get(row["tweet_id"])
+        if fingerprint is None or fingerprint != tweet_fingerprint(row):
+            return False
+        self.fingerprints.move_to_end(row["tweet_id"])
+        self.unchanged_skipped += 1
+        return True
+
+    def remember(self, row: dict):
+        if self.max_size <= 0:
+            return
+        self.fingerprints[row["tweet_id"]] = tweet_fingerprint(row)
+        self.fingerprints.move_to_end(row["tweet_id"])
+        while len(self.fingerprints) > self.max_size:
+            self.fingerprints.popitem(last=False)
+
+    async def seed(self):
+        """Warm the index with the most recently written tweets, one page at a time"""
+        try:
+            rows = []
+            while len(rows) < self.max_size:
+                page_size = min(SEEN_TWEETS_SEED_PAGE_SIZE, self.max_size - len(rows))
+                query = (
+                    get_supabase().table('tweets')
+                        .select(", ".join(("tweet_id", "updated_at") + MUTABLE_TWEET_COLUMNS))
+                        .order('updated_at', desc=True)
+                        .order('tweet_id', desc=True)
+                )
+                if rows:
+                    # Keyset pagination: continue after the last row, so tweets written while
+                    # seeding do not shift the pages, and rows sharing updated_at are not skipped
+                    updated_at, tweet_id = rows[-1]['updated_at'], rows[-1]['tweet_id']
+                    query = query.or_(f'updated_at.lt."{updated_at}",and(updated_at.eq."{updated_at}",tweet_id.lt."{tweet_id}")')
+                response = await execute_query(query.limit(page_size), 'seed_seen_tweets')
+                # A page may be shorter than asked for when the server caps it, so only an empty one ends
+                if not response.data:
+                    break
+                rows.extend(response.data)
+
+            # Oldest first, so the most recent end up at the hot end of the LRU
+            for row in reversed(rows):
+                if row["tweet_id"] not in self.fingerprints:
+                    self.remember(row)
+                    self.seeded += 1
+            logger.info(f"🌱  Seeded seen-tweet index with {self.seeded} tweets")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"🚨 Failed to seed seen-tweet index: {str(e)}")
+
+    def start_seeding(self):
+        """Seed in the background so startup does not wait for the database"""
+        if self.max_size > 0 and self.seed_task is None:
+            self.seed_task = asyncio.create_task(self.seed())
+
+    def stop(self):
+        if self.seed_task and not self.seed_task.done():
+            self.seed_task.cancel()
+
+    def stats(self) -> SeenTweetsStats:
+        return SeenTweetsStats(
+            size=len(self.fingerprints),
+            max_size=self.max_size,
+            seeded=self.seeded,
+            unchanged_skipped=self.unchanged_skipped
+        )
+
+# Create a global instance for upsert_tweets_batch
+seen_tweets = SeenTweetIndex(SEEN_TWEETS_SIZE)
+SEEN_TWEETS_ENTRIES.set_function(lambda: len(seen_tweets.fingerprints))
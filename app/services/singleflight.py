@@ -0,0 +1,39 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+from loguru import logger
+
+class SingleFlight:
+    """Coalesce identical concurrent calls so they share one in-flight task"""
+
+    def __init__(self):
+        self.in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.started_count = 0
+        self.coalesced_count = 0
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable]):
+        """
+        Await func() or, if a call with the same key is already running, its result
+
+        Every caller receives the raw result or exception of the shared call; cancelling
+        one caller does not cancel the call for the others.
+        """
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(func())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.started_count += 1
+        else:
+            self.coalesced_count += 1
+            logger.debug(f"🔗  Joining in-flight request {key}")
+        return await asyncio.shield(task)
+
+# Create a global instance for upstream Twitter requests
+twitter_singleflight = SingleFlight()
@@ -0,0 +1,45 @@
+import asyncio
+import fcntl
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from loguru import logger
+
+def load_json_state(path: str, default):
+    """Load JSON state from disk, falling back to default if it is missing or unreadable"""
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"🚨 Failed to load state from {path}: {str(e)}")
+        return default
+
+def write_json_atomic(path: str, data) -> None:
+    """Write JSON to a temporary file and atomically replace the target"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+async def save_json_state(path: str, data) -> None:
+    """Persist JSON state atomically without blocking the event loop"""
+    await asyncio.to_thread(write_json_atomic, path, data)
+
+@contextmanager
+def locked_state(path: str):
+    """Exclusive lock on a file next to path, for read-modify-write of state shared by the processes of one host"""
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
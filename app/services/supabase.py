@@ -1,6 +1,36 @@
 import os
-from supabase import create_client, Client
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from app.services.metrics import SUPABASE_QUERY_DURATION
 
-url: str = os.environ.get("SUPABASE_API_URL")
-key: str = os.environ.get("SUPABASE_API_KEY")
-supabase: Client = create_client(url, key)
+# Maximum number of Supabase requests executed concurrently
+SUPABASE_MAX_CONCURRENCY = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=SUPABASE_MAX_CONCURRENCY, thread_name_prefix="supabase")
+
+@lru_cache()
+def get_supabase() -> "Client":
+    """Shared Supabase client, created on first use"""
+    # Imported here to keep importing the app cheap
+    from supabase import create_client, Client
+
+    url: str = os.environ.get("SUPABASE_API_URL")
+    key: str = os.environ.get("SUPABASE_API_KEY")
+    return create_client(url, key)
+
+async def execute_query(query, name: str = "query"):
+    """
+    Execute a Supabase query builder in the bounded thread pool, off the event loop
+    name labels the query in the latency metrics
+    """
+    loop = asyncio.get_running_loop()
+    started_at = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_executor, query.execute)
+    finally:
+        SUPABASE_QUERY_DURATION.labels(name).observe(time.perf_counter() - started_at)
+
+def shutdown_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
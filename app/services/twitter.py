@@ -6,65 +6,137 @@ import asyncio
 from typing import Optional
 import os
 import json
+import time
 from loguru import logger
+from app.services.state_store import load_json_state, save_json_state
+from app.services.metrics import TWITTER_AUTH_ATTEMPTS, TWITTER_LOGINS
+from app.services.twitter_mock import MockTwitterClient
+from app.services.twitter_recorder import (
+    TWITTER_RECORD_DIR, TWITTER_REPLAY_DIR, ReplayClient, RecordingClient, get_recorder, get_replay_corpus
+)
 
 USE_TWITTER_MOCKS = os.getenv("USE_TWITTER_MOCKS", "false").lower() == "true"
 
+# Mock and replay clients serve canned responses and never log in
+OFFLINE_MODE = USE_TWITTER_MOCKS or bool(TWITTER_REPLAY_DIR)
+
+# How long a verified session is trusted before it is checked again
+SESSION_CHECK_TTL = int(os.getenv("TWITTER_SESSION_CHECK_TTL", "600"))  # seconds
+
 ExecutionStopError = (asyncio.CancelledError, KeyboardInterrupt, SystemError)
 
+def create_client():
+    """twikit client for the configured mode: mock, replay, recording or live"""
+    if USE_TWITTER_MOCKS:
+        return MockTwitterClient()
+    if TWITTER_REPLAY_DIR:
+        return ReplayClient(get_replay_corpus())
+    if TWITTER_RECORD_DIR:
+        return RecordingClient(Client('en-US'), get_recorder())
+    return Client('en-US')
+
 class TwitterClient:
-    def __init__(self):
-        self.client = Client('en-US')
-        self.client.load_cookies('cookies.json')
-        self.credentials = get_twitter_credentials()
+    def __init__(self, credentials: Optional[dict] = None, cookies_path: str = 'cookies.json'):
+        self.cookies_path = cookies_path
+        self.client = create_client()
+        self.cookies_loaded = False  # cookies are read on first authentication, not at construction
+        self.credentials = credentials or get_twitter_credentials()
         self.is_authenticated = False
+        self.session_verified_at = 0.0  # time.monotonic() of the last proof that the session works
+        self.auth_lock = asyncio.Lock()
         self.auth_retries = 0
         self.max_retries = 3
         self.retry_delay = 30 # seconds
         logger.info(f'🙍‍♂️  Username: {self.credentials["username"]}')
 
+    @property
+    def username(self) -> str:
+        return self.credentials["username"]
+
+    def _is_session_fresh(self) -> bool:
+        return self.is_authenticated and time.monotonic() - self.session_verified_at < SESSION_CHECK_TTL
+
+    def mark_session_valid(self):
+        """Record that an upstream call succeeded, so the session does not need to be re-checked"""
+        self.is_authenticated = True
+        self.session_verified_at = time.monotonic()
+
     async def ensure_authenticated(self):
-        if USE_TWITTER_MOCKS:
-            logger.info("📙  Mock mode is enabled; skipping authentication.")
+        if OFFLINE_MODE:
             self.is_authenticated = True
             return True
 
-        if self.is_authenticated:
+        if self._is_session_fresh():
             return True
-            
-        while self.auth_retries < self.max_retries:
-            try:
-                await self.authenticate()
+
+        # Only one caller verifies or logs in; the others wait and reuse its result
+        async with self.auth_lock:
+            if self._is_session_fresh():
                 return True
-            except Exception as e:
-                self.auth_retries += 1
-                logger.error(f'Authentication attempt {self.auth_retries} failed: {str(e)}')
-                
-                if self.auth_retries < self.max_retries:
-                    delay = self.retry_delay * (2 ** (self.auth_retries - 1))  # Exponential backoff
-                    logger.info(f'⏳  Waiting {delay} seconds before retry...')
-                    await asyncio.sleep(delay)
-                else:
-                    logger.error('Max authentication retries reached')
+
+            await self._load_cookies()
+
+            while self.auth_retries < self.max_retries:
+                try:
+                    await self._authenticate()
+                    return True
+                except ExecutionStopError:
                     raise
+                except Exception as e:
+                    self.auth_retries += 1
+                    logger.error(f'Authentication attempt {self.auth_retries} failed: {str(e)}')
+                    
+                    if self.auth_retries < self.max_retries:
+                        delay = self.retry_delay * (2 ** (self.auth_retries - 1))  # Exponential backoff
+                        logger.info(f'⏳  Waiting {delay} seconds before retry...')
+                        await asyncio.sleep(delay)
+                    else:
+                        logger.error('Max authentication retries reached')
+                        raise
         
         return False
 
+    async def _load_cookies(self):
+        if self.cookies_loaded:
+            return
+        cookies = await asyncio.to_thread(load_json_state, self.cookies_path, None)
+        if cookies:
+            self.client.set_cookies(cookies)
+        self.cookies_loaded = True
+
     async def authenticate(self):
+        """Re-authenticate after the session was rejected, unless another caller just did it"""
+        if OFFLINE_MODE:
+            self.mark_session_valid()
+            return
+
+        requested_at = time.monotonic()
+        async with self.auth_lock:
+            if self.is_authenticated and self.session_verified_at > requested_at:
+                return
+            self.is_authenticated = False
+            await self._load_cookies()
+            await self._authenticate()
+
+    async def _authenticate(self):
         logger.info(f'🔑  Authenticating as {self.credentials["username"]}...')
         try:
             # First try to verify if existing cookies are valid
             if await self._verify_existing_session():
                 logger.info('✅  Using existing session')
-                self.is_authenticated = True
+                TWITTER_AUTH_ATTEMPTS.labels(self.username, "session_reused").inc()
+                self.mark_session_valid()
                 return
 
             # If not, perform full authentication
+            TWITTER_LOGINS.labels(self.username).inc()
             await self._perform_full_authentication()
+            TWITTER_AUTH_ATTEMPTS.labels(self.username, "success").inc()
             
         except ExecutionStopError:
             raise
         except Exception as e:
+            TWITTER_AUTH_ATTEMPTS.labels(self.username, "failure").inc()
             self.is_authenticated = False
             logger.error(f'❌  Authentication failed: {str(e)}')
             raise
@@ -72,8 +144,8 @@ class TwitterClient:
     async def _verify_existing_session(self) -> bool:
         """Verify if existing cookies are valid"""
         try:
-            # Try a simple API call to verify session
-            await self.client.get_timeline(count=1)
+            # account/settings is the lightest authenticated call and is not timeline rate limited
+            await self.client.v11.settings()
             return True
         except ExecutionStopError:
             raise
@@ -82,7 +154,7 @@ class TwitterClient:
 
     async def _perform_full_authentication(self):
         """Perform full authentication process"""
-        self.client = Client('en-US')
+        self.client = create_client()
         
         # Perform login
         await self.client.login(
@@ -91,9 +163,9 @@ class TwitterClient:
             password=self.credentials['password']
         )
         
-        # Save new cookies
-        self.client.save_cookies('cookies.json')
-        self.is_authenticated = True
+        # Save new cookies atomically and off the event loop
+        await save_json_state(self.cookies_path, self.client.get_cookies())
+        self.mark_session_valid()
         self.auth_retries = 0  # Reset retry counter on success
         logger.info('✅  Authentication successful')
 
@@ -110,31 +182,17 @@ class TwitterClient:
         ]
 
     def process_tweet(self, tweet, tweet_count):
-        if USE_TWITTER_MOCKS:
-            photo_urls = self.get_photo_urls(tweet['media'] if 'media' in tweet else [])
-            result = {
-                'tweet_id': tweet['id'],
-                'tweet_user_name': tweet['user']['name'],
-                'tweet_user_nick': tweet['user']['screen_name'],
-                'text': tweet['text'],
-                'created_at': str(tweet['created_at']),
-                'retweets': tweet['retweet_count'],
-                'likes': tweet['favorite_count'],
-                'photo_urls': photo_urls,
-                'tweet_lang': tweet['lang'],
-            }
-        else:
-            photo_urls = self.get_photo_urls(tweet.media if hasattr(tweet, 'media') else [])
-            result = {
-                'tweet_id': tweet.id,
-                'tweet_user_name': tweet.user.name,
-                'tweet_user_nick': tweet.user.screen_name,
-                'text': tweet.text,
-                'created_at': str(tweet.created_at),
-                'retweets': tweet.retweet_count,
-                'likes': tweet.favorite_count,
-                'photo_urls': photo_urls,
-                'tweet_lang': tweet.lang,
-            }
-        
-        return result 
\ No newline at end of file
+        photo_urls = self.get_photo_urls(tweet.media if hasattr(tweet, 'media') else [])
+        return {
+            'tweet_id': tweet.id,
+            'tweet_user_name': tweet.user.name,
+            'tweet_user_nick': tweet.user.screen_name,
+            'text': tweet.text,
+            'created_at': str(tweet.created_at),
+            'retweets': tweet.retweet_count,
+            'likes': tweet.favorite_count,
+            'photo_urls': photo_urls,
+            'tweet_lang': tweet.lang,
+            # twikit returns the view count as a string, absent for old tweets
+            'views': int(tweet.view_count) if str(getattr(tweet, 'view_count', None) or '').isdigit() else 0,
+        }
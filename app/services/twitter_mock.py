@@ -0,0 +1,339 @@
+import asyncio
+import json
+import os
+import random
+import time
+import zlib
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional
+from loguru import logger
+
+MOCKS_DIR = os.getenv("TWITTER_MOCKS_DIR", "app/mocks")
+MOCK_FIXTURES = ("tweets.json", "tweets2.json")
+
+# Number of synthetic pages served for every timeline and search
+TWITTER_MOCK_PAGES = int(os.getenv("TWITTER_MOCK_PAGES", "5"))
+TWITTER_MOCK_PAGE_SIZE = int(os.getenv("TWITTER_MOCK_PAGE_SIZE", "20"))
+TWITTER_MOCK_REPLIES = int(os.getenv("TWITTER_MOCK_REPLIES", "12"))
+# Injected latency per call, uniformly distributed between min and max
+TWITTER_MOCK_LATENCY_MIN_MS = int(os.getenv("TWITTER_MOCK_LATENCY_MIN_MS", "0"))
+TWITTER_MOCK_LATENCY_MAX_MS = int(os.getenv("TWITTER_MOCK_LATENCY_MAX_MS", "0"))
+# Share of calls failing with one of the configured twikit errors
+TWITTER_MOCK_ERROR_RATE = float(os.getenv("TWITTER_MOCK_ERROR_RATE", "0"))
+TWITTER_MOCK_ERRORS = [
+    name.strip() for name in os.getenv("TWITTER_MOCK_ERRORS", "TooManyRequests,ServerError").split(",") if name.strip()
+]
+
+# Distance between the IDs of the same fixture on consecutive synthetic pages
+PAGE_ID_STEP = 10 ** 9
+TWITTER_DATE_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+class MockUser:
+    def __init__(self, id: str, name: str, screen_name: str, profile_image_url_https: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.screen_name = screen_name
+        self.profile_image_url_https = profile_image_url_https
+
+class MockTweet:
+    """Tweet with the attributes read from twikit.Tweet"""
+
+    def __init__(
+        self,
+        id: str,
+        text: str,
+        created_at: str,
+        user: MockUser,
+        lang: str = "en",
+        retweet_count: int = 0,
+        favorite_count: int = 0,
+        media: Optional[List[dict]] = None,
+        in_reply_to: Optional[str] = None,
+        in_reply_to_user_id: Optional[str] = None,
+        in_reply_to_screen_name: Optional[str] = None
+    ):
+        self.id = id
+        self.text = text
+        self.full_text = text
+        self.created_at = created_at
+        self.user = user
+        self.lang = lang
+        self.retweet_count = retweet_count
+        self.favorite_count = favorite_count
+        self.view_count = None
+        self.media = media or []
+        self.in_reply_to = in_reply_to
+        self.in_reply_to_status_id = in_reply_to
+        self.in_reply_to_user_id = in_reply_to_user_id
+        self.in_reply_to_screen_name = in_reply_to_screen_name
+        self.favorited = False
+        self.replies = None
+
+    @property
+    def created_at_datetime(self) -> datetime:
+        return datetime.strptime(self.created_at, TWITTER_DATE_FORMAT)
+
+class MockNotification:
+    def __init__(self, id: str, message: str, timestamp_ms: int, icon: dict, from_user: MockUser, tweet: Optional[MockTweet]):
+        self.id = id
+        self.message = message
+        self.timestamp_ms = timestamp_ms
+        self.icon = icon
+        self.from_user = from_user
+        self.tweet = tweet
+
+class MockResult:
+    """List-like page with cursors and next(), like twikit.utils.Result"""
+
+    def __init__(
+        self,
+        results: list,
+        fetch_next_result: Optional[Callable[[], Awaitable["MockResult"]]] = None,
+        next_cursor: Optional[str] = None,
+        previous_cursor: Optional[str] = None
+    ):
+        self.results = results
+        self.fetch_next_result = fetch_next_result
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    async def next(self) -> "MockResult":
+        if self.fetch_next_result is None:
+            return MockResult([])
+        return await self.fetch_next_result()
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __getitem__(self, index):
+        return self.results[index]
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+def _user_from_fixture(user: dict) -> MockUser:
+    screen_name = user.get("screen_name") or user.get("username", "")
+    return MockUser(
+        id=str(user.get("id") or zlib.crc32(screen_name.encode())),
+        name=user.get("name", ""),
+        screen_name=screen_name,
+        profile_image_url_https=user.get("profile_image_url_https") or user.get("profile_image_url")
+    )
+
+def _tweet_from_fixture(data: dict) -> MockTweet:
+    """Accept both the raw tweet shape (tweets.json) and the TweetDetails shape (tweets2.json)"""
+    media = data.get("media")
+    if media is None:
+        media = [
+            {"type": "photo", "media_url_https": url, "ext_media_availability": {"status": "Available"}}
+            for url in data.get("photo_urls", [])
+        ]
+    return MockTweet(
+        id=str(data["id"]),
+        text=data["text"],
+        created_at=str(data["created_at"]),
+        user=_user_from_fixture(data.get("user") or data.get("author") or {}),
+        lang=data.get("lang", "en"),
+        retweet_count=data.get("retweet_count", 0),
+        favorite_count=data.get("favorite_count", 0),
+        media=media,
+        in_reply_to=data.get("in_reply_to_status_id") or data.get("in_reply_to"),
+        in_reply_to_user_id=data.get("in_reply_to_user_id"),
+        in_reply_to_screen_name=data.get("in_reply_to_screen_name")
+    )
+
+def _clone_tweet(tweet: MockTweet, id: str, **changes) -> MockTweet:
+    clone = MockTweet(
+        id=id,
+        text=tweet.text,
+        created_at=tweet.created_at,
+        user=tweet.user,
+        lang=tweet.lang,
+        retweet_count=tweet.retweet_count,
+        favorite_count=tweet.favorite_count,
+        media=tweet.media,
+        in_reply_to=tweet.in_reply_to,
+        in_reply_to_user_id=tweet.in_reply_to_user_id,
+        in_reply_to_screen_name=tweet.in_reply_to_screen_name
+    )
+    for name, value in changes.items():
+        setattr(clone, name, value)
+    clone.in_reply_to_status_id = clone.in_reply_to
+    return clone
+
+class MockTwitterBackend:
+    """Fixtures loaded once into ID-indexed structures, shared by all mock clients"""
+
+    def __init__(self, fixtures: List[dict]):
+        base_tweets = sorted((_tweet_from_fixture(data) for data in fixtures), key=lambda tweet: int(tweet.id), reverse=True)
+
+        # Every synthetic page repeats the fixtures with older IDs, newest first like a real timeline
+        self.timeline: List[MockTweet] = [
+            _clone_tweet(tweet, str(int(tweet.id) - page * PAGE_ID_STEP)) if page else tweet
+            for page in range(TWITTER_MOCK_PAGES)
+            for tweet in base_tweets
+        ]
+        self.tweets: Dict[str, MockTweet] = {tweet.id: tweet for tweet in self.timeline}
+        self.replies: Dict[str, List[MockTweet]] = {}
+        self.account = MockUser(id="1", name="Mock Account", screen_name="mock_account")
+        self.favorited: set = set()
+        self.last_id = max(int(tweet.id) for tweet in self.timeline) if self.timeline else 0
+        logger.info(f"📙  Loaded {len(base_tweets)} mock fixtures, serving {len(self.timeline)} mock tweets")
+
+    def next_id(self) -> str:
+        self.last_id += 1
+        return str(self.last_id)
+
+    def replies_for(self, tweet: MockTweet) -> List[MockTweet]:
+        """Synthetic conversation under a tweet, built once; every third reply answers the previous reply"""
+        if tweet.id in self.replies:
+            return self.replies[tweet.id]
+        if not self.timeline or tweet.in_reply_to:
+            return []
+        replies = []
+        for index in range(TWITTER_MOCK_REPLIES):
+            source = self.timeline[index % len(self.timeline)]
+            parent = replies[-1] if index % 3 == 2 else tweet
+            reply = _clone_tweet(
+                source,
+                self.next_id(),
+                text=f"@{parent.user.screen_name} {source.text}",
+                in_reply_to=parent.id,
+                in_reply_to_user_id=parent.user.id,
+                in_reply_to_screen_name=parent.user.screen_name
+            )
+            self.tweets[reply.id] = reply
+            replies.append(reply)
+        self.replies[tweet.id] = replies
+        return replies
+
+    def notifications(self, notification_type: str) -> List[MockNotification]:
+        notifications = []
+        for tweet in self.timeline:
+            timestamp_ms = int(tweet.created_at_datetime.timestamp() * 1000)
+            notifications.append(MockNotification(
+                id=f"mention-{tweet.id}",
+                message=f"{tweet.user.name} mentioned you",
+                timestamp_ms=timestamp_ms,
+                icon={"id": "reply_icon"},
+                from_user=tweet.user,
+                tweet=tweet
+            ))
+            if notification_type != "Mentions":
+                notifications.append(MockNotification(
+                    id=f"like-{tweet.id}",
+                    message=f"{tweet.user.name} liked your post",
+                    timestamp_ms=timestamp_ms + 1,
+                    icon={"id": "heart_icon"},
+                    from_user=tweet.user,
+                    tweet=None
+                ))
+        return sorted(notifications, key=lambda notif: notif.timestamp_ms, reverse=True)
+
+@lru_cache()
+def get_mock_backend() -> MockTwitterBackend:
+    fixtures = []
+    for name in MOCK_FIXTURES:
+        path = os.path.join(MOCKS_DIR, name)
+        if os.path.exists(path):
+            with open(path) as f:
+                fixtures.extend(json.load(f))
+    return MockTwitterBackend(fixtures)
+
+def _mock_error(name: str) -> Exception:
+    from twikit import TooManyRequests, ServerError, RequestTimeout, Unauthorized
+
+    if name == "TooManyRequests":
+        return TooManyRequests("Mock rate limit", headers={"x-rate-limit-reset": str(int(time.time()) + 60)})
+    errors = {"ServerError": ServerError, "RequestTimeout": RequestTimeout, "Unauthorized": Unauthorized}
+    return errors.get(name, ServerError)(f"Mock {name}")
+
+class MockTwitterClient:
+    """Stand-in for twikit.Client serving fixtures with pagination, latency and error injection"""
+
+    def __init__(self):
+        self.backend = None
+
+    async def _simulate(self) -> MockTwitterBackend:
+        if TWITTER_MOCK_LATENCY_MAX_MS > 0:
+            await asyncio.sleep(random.uniform(TWITTER_MOCK_LATENCY_MIN_MS, TWITTER_MOCK_LATENCY_MAX_MS) / 1000)
+        if TWITTER_MOCK_ERROR_RATE > 0 and TWITTER_MOCK_ERRORS and random.random() < TWITTER_MOCK_ERROR_RATE:
+            raise _mock_error(random.choice(TWITTER_MOCK_ERRORS))
+        if self.backend is None:
+            self.backend = get_mock_backend()
+        return self.backend
+
+    def _page(self, items: list, cursor: Optional[str], count: int, fetch_page) -> MockResult:
+        offset = int(cursor) if cursor else 0
+        end = offset + count
+        next_cursor = str(end) if end < len(items) else None
+        return MockResult(
+            items[offset:end],
+            fetch_next_result=(lambda: fetch_page(next_cursor)) if next_cursor else None,
+            next_cursor=next_cursor,
+            previous_cursor=str(max(offset - count, 0)) if offset else None
+        )
+
+    async def get_timeline(self, count: int = TWITTER_MOCK_PAGE_SIZE, cursor: Optional[str] = None, **kwargs) -> MockResult:
+        backend = await self._simulate()
+        return self._page(backend.timeline, cursor, count, lambda next_cursor: self.get_timeline(count, next_cursor))
+
+    async def get_latest_timeline(self, count: int = TWITTER_MOCK_PAGE_SIZE, cursor: Optional[str] = None, **kwargs) -> MockResult:
+        backend = await self._simulate()
+        return self._page(backend.timeline, cursor, count, lambda next_cursor: self.get_latest_timeline(count, next_cursor))
+
+    async def search_tweet(
+        self, query: str, product: str = "Top", count: int = TWITTER_MOCK_PAGE_SIZE, cursor: Optional[str] = None
+    ) -> MockResult:
+        backend = await self._simulate()
+        words = [word.lower() for word in query.split()]
+        matches = [tweet for tweet in backend.timeline if any(word in tweet.text.lower() for word in words)]
+        # Fall back to the whole timeline so any query produces realistic volumes
+        items = matches or backend.timeline
+        return self._page(items, cursor, count, lambda next_cursor: self.search_tweet(query, product, count, next_cursor))
+
+    async def get_tweet_by_id(self, tweet_id: str, cursor: Optional[str] = None) -> Optional[MockTweet]:
+        backend = await self._simulate()
+        tweet = backend.tweets.get(str(tweet_id))
+        if not tweet:
+            from twikit import NotFound
+            raise NotFound(f"Mock tweet {tweet_id} not found")
+
+        replies = backend.replies_for(tweet)
+        page_size = max(TWITTER_MOCK_REPLIES // 3, 1)
+
+        async def fetch_replies(next_cursor: Optional[str]) -> MockResult:
+            await self._simulate()
+            return self._page(replies, next_cursor, page_size, fetch_replies)
+
+        tweet.replies = self._page(replies, None, page_size, fetch_replies) if replies else None
+        return tweet
+
+    async def get_notifications(self, type: str, count: int = 40, cursor: Optional[str] = None) -> MockResult:
+        backend = await self._simulate()
+        items = backend.notifications(type)
+        return self._page(items, cursor, count, lambda next_cursor: self.get_notifications(type, count, next_cursor))
+
+    async def favorite_tweet(self, tweet_id: str) -> dict:
+        backend = await self._simulate()
+        backend.favorited.add(str(tweet_id))
+        tweet = backend.tweets.get(str(tweet_id))
+        if tweet:
+            tweet.favorited = True
+        return {"data": {"favorite_tweet": "Done"}}
+
+    async def create_tweet(self, text: str = "", reply_to: Optional[str] = None, **kwargs) -> MockTweet:
+        backend = await self._simulate()
+        parent = backend.tweets.get(str(reply_to)) if reply_to else None
+        tweet = MockTweet(
+            id=backend.next_id(),
+            text=text,
+            created_at=datetime.now(timezone.utc).strftime(TWITTER_DATE_FORMAT),
+            user=backend.account,
+            in_reply_to=str(reply_to) if reply_to else None,
+            in_reply_to_user_id=parent.user.id if parent else None,
+            in_reply_to_screen_name=parent.user.screen_name if parent else None
+        )
+        backend.tweets[tweet.id] = tweet
+        return tweet
@@ -0,0 +1,123 @@
+import os
+import time
+from typing import Callable, Dict, List, Optional
+from loguru import logger
+from pydantic import BaseModel
+from app.services.twitter import TwitterClient
+
+# Seconds an account that failed authentication or is locked gets no reads before it is tried again
+TWITTER_ACCOUNT_COOLDOWN = float(os.getenv("TWITTER_ACCOUNT_COOLDOWN", "900"))
+
+class AccountState:
+    def __init__(self):
+        self.in_flight = 0
+        self.request_count = 0
+        self.unhealthy_until = 0.0  # time.monotonic() until which the account is skipped
+        self.last_error: Optional[str] = None
+
+class AccountStatus(BaseModel):
+    username: str
+    is_primary: bool
+    is_authenticated: bool
+    is_healthy: bool
+    last_error: Optional[str] = None
+    cooldown_remaining: Optional[float] = None
+    in_flight: int
+    request_count: int
+
+class TwitterClientPool:
+    """
+    Pool of Twitter accounts
+
+    Reads are routed to the healthy account that can serve the endpoint soonest and is least loaded,
+    writes always go to the primary account. Accounts that failed authentication or are locked
+    are skipped for TWITTER_ACCOUNT_COOLDOWN seconds, unless no healthy account is left.
+    """
+
+    def __init__(self, accounts: List[TwitterClient]):
+        if not accounts:
+            raise ValueError("Twitter client pool needs at least one account")
+        self.accounts = accounts
+        self.states: Dict[int, AccountState] = {id(account): AccountState() for account in accounts}
+
+    @property
+    def primary(self) -> TwitterClient:
+        return self.accounts[0]
+
+    def state(self, account: TwitterClient) -> AccountState:
+        return self.states[id(account)]
+
+    def is_healthy(self, account: TwitterClient) -> bool:
+        return self.state(account).unhealthy_until <= time.monotonic()
+
+    def mark_unhealthy(self, account: TwitterClient, reason: str):
+        state = self.state(account)
+        state.unhealthy_until = time.monotonic() + TWITTER_ACCOUNT_COOLDOWN
+        state.last_error = reason
+        logger.warning(f"🩹  Skipping {account.username} for {TWITTER_ACCOUNT_COOLDOWN:.0f} seconds: {reason}")
+
+    def mark_healthy(self, account: TwitterClient):
+        state = self.state(account)
+        if state.unhealthy_until or state.last_error:
+            state.unhealthy_until = 0.0
+            state.last_error = None
+            # Give authentication a fresh set of retries once the account works again
+            account.auth_retries = 0
+
+    def acquire(
+        self,
+        write: bool = False,
+        excluded: List[TwitterClient] = (),
+        pinned: Optional[TwitterClient] = None,
+        wait_time: Optional[Callable[[TwitterClient], float]] = None
+    ) -> Optional[TwitterClient]:
+        """
+        Pick an account for a request and mark it busy
+
+        wait_time estimates how long an account has to wait for its rate limit;
+        returns None if every account has been excluded.
+        """
+        if pinned:
+            account = pinned
+        elif write:
+            account = self.primary
+        else:
+            candidates = [account for account in self.accounts if account not in excluded]
+            if not candidates:
+                return None
+            # Unhealthy accounts are only used when nothing else is left, and then fail fast
+            candidates = [account for account in candidates if self.is_healthy(account)] or candidates
+            account = min(
+                candidates,
+                key=lambda account: (
+                    wait_time(account) if wait_time else 0.0,
+                    self.state(account).in_flight,
+                    self.state(account).request_count
+                )
+            )
+
+        state = self.state(account)
+        if state.unhealthy_until and self.is_healthy(account):
+            # The cooldown is over: let authentication be retried
+            account.auth_retries = 0
+        state.in_flight += 1
+        state.request_count += 1
+        return account
+
+    def release(self, account: TwitterClient):
+        self.state(account).in_flight -= 1
+
+    def status(self) -> List[AccountStatus]:
+        return [
+            AccountStatus(
+                username=account.username,
+                is_primary=account is self.primary,
+                is_authenticated=account.is_authenticated,
+                is_healthy=self.is_healthy(account),
+                last_error=self.state(account).last_error,
+                cooldown_remaining=round(self.state(account).unhealthy_until - time.monotonic(), 1) if not self.is_healthy(account) else None,
+                in_flight=self.state(account).in_flight,
+                request_count=self.state(account).request_count
+            )
+            for account in self.accounts
+        ]
@@ -0,0 +1,359 @@
+import asyncio
+import copy
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import count, cycle
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+# Record raw twikit responses into this directory
+TWITTER_RECORD_DIR = os.getenv("TWITTER_RECORD_DIR")
+# Serve twikit responses recorded in this directory instead of calling Twitter
+TWITTER_REPLAY_DIR = os.getenv("TWITTER_REPLAY_DIR")
+
+# Start of Twitter snowflake IDs
+TWITTER_EPOCH_MS = 1288834974657
+
+# Replay has no logged-in account; created tweets are attributed to this user, like the mock account
+REPLAY_ACCOUNT = {"id": "1", "name": "Replay Account", "screen_name": "replay_account"}
+
+def serialize_user(user) -> Optional[dict]:
+    """
+    User data in the GraphQL shape twikit.User is built from
+
+    twikit.User does not keep its raw data, so it is rebuilt from the attributes.
+    """
+    if user is None:
+        return None
+    return {
+        "rest_id": user.id,
+        "is_blue_verified": getattr(user, 'is_blue_verified', False),
+        "legacy": {
+            "created_at": getattr(user, 'created_at', None),
+            "name": user.name,
+            "screen_name": user.screen_name,
+            "profile_image_url_https": getattr(user, 'profile_image_url', None) or getattr(user, 'profile_image_url_https', None),
+            "profile_banner_url": getattr(user, 'profile_banner_url', None),
+            "url": getattr(user, 'url', None),
+            "location": getattr(user, 'location', ""),
+            "description": getattr(user, 'description', ""),
+            "entities": {
+                "description": {"urls": getattr(user, 'description_urls', None) or []},
+                "url": {"urls": getattr(user, 'urls', None) or []}
+            },
+            "pinned_tweet_ids_str": getattr(user, 'pinned_tweet_ids', None) or [],
+            "verified": getattr(user, 'verified', False),
+            "possibly_sensitive": getattr(user, 'possibly_sensitive', False),
+            "can_dm": getattr(user, 'can_dm', False),
+            "can_media_tag": getattr(user, 'can_media_tag', False),
+            "want_retweets": getattr(user, 'want_retweets', False),
+            "default_profile": getattr(user, 'default_profile', False),
+            "default_profile_image": getattr(user, 'default_profile_image', False),
+            "has_custom_timelines": getattr(user, 'has_custom_timelines', False),
+            "followers_count": getattr(user, 'followers_count', 0),
+            "fast_followers_count": getattr(user, 'fast_followers_count', 0),
+            "normal_followers_count": getattr(user, 'normal_followers_count', 0),
+            "friends_count": getattr(user, 'following_count', 0),
+            "favourites_count": getattr(user, 'favourites_count', 0),
+            "listed_count": getattr(user, 'listed_count', 0),
+            "media_count": getattr(user, 'media_count', 0),
+            "statuses_count": getattr(user, 'statuses_count', 0),
+            "is_translator": getattr(user, 'is_translator', False),
+            "translator_type": getattr(user, 'translator_type', "none"),
+            "withheld_in_countries": getattr(user, 'withheld_in_countries', None) or [],
+            "protected": getattr(user, 'protected', False)
+        }
+    }
+
+def serialize_tweet_data(tweet) -> Optional[dict]:
+    """
+    Raw tweet data with the parts twikit.Tweet consumes while parsing put back
+
+    The Tweet constructor pops the quoted and retweeted tweets out of its data, and tweets
+    of notifications have no embedded author, so those are restored from the parsed objects.
+    """
+    raw = getattr(tweet, '_data', None)
+    if raw is None:
+        return None
+    data = dict(raw)
+    if 'result' not in data.get('core', {}).get('user_results', {}) and getattr(tweet, 'user', None):
+        data['core'] = {'user_results': {'result': serialize_user(tweet.user)}}
+    if getattr(tweet, 'quote', None) is not None:
+        data['quoted_status_result'] = {'result': serialize_tweet_data(tweet.quote)}
+    if getattr(tweet, 'retweeted_tweet', None) is not None:
+        data['legacy'] = {**data['legacy'], 'retweeted_status_result': {'result': serialize_tweet_data(tweet.retweeted_tweet)}}
+    return data
+
+def serialize_tweet(tweet) -> dict:
+    data = serialize_tweet_data(tweet)
+    user = data['core']['user_results']['result'] if data and 'core' in data else serialize_user(getattr(tweet, 'user', None))
+    return {"data": data, "user": user}
+
+def serialize_notification(notif) -> dict:
+    return {
+        "data": {
+            "id": notif.id,
+            "timestampMs": str(notif.timestamp_ms),
+            "icon": notif.icon,
+            "message": {"text": notif.message}
+        },
+        "tweet": serialize_tweet(notif.tweet) if notif.tweet else None,
+        "from_user": serialize_user(notif.from_user)
+    }
+
+def deserialize_tweet(client, item: dict):
+    from twikit import Tweet, User
+
+    # twikit.Tweet pops nested tweets out of its data, so every replay gets its own copy
+    data = copy.deepcopy(item["data"])
+    user = User(client, item["user"]) if item.get("user") else None
+    return Tweet(client, data, user)
+
+def deserialize_notification(client, item: dict):
+    from twikit import User
+    from twikit.notification import Notification
+
+    tweet = deserialize_tweet(client, item["tweet"]) if item.get("tweet") else None
+    from_user = User(client, item["from_user"]) if item.get("from_user") else None
+    return Notification(client, item["data"], tweet, from_user)
+
+class RecordingResult:
+    """Wraps a twikit Result so that every page fetched with next() is recorded too"""
+
+    def __init__(self, result, fetch_next_result):
+        self.result = result
+        self.fetch_next_result = fetch_next_result
+        self.next_cursor = getattr(result, 'next_cursor', None)
+        self.previous_cursor = getattr(result, 'previous_cursor', None)
+
+    async def next(self):
+        return await self.fetch_next_result()
+
+    def __iter__(self):
+        return iter(self.result)
+
+    def __getitem__(self, index):
+        return self.result[index]
+
+    def __len__(self) -> int:
+        return len(self.result)
+
+class TwitterRecorder:
+    """Appends raw responses as compact gzip-compressed JSON lines"""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"recording-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}.jsonl.gz")
+        self.lock = threading.Lock()
+        logger.info(f"⏺️  Recording Twitter responses to {self.path}")
+
+    def _append(self, record: dict):
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        with self.lock, gzip.open(self.path, "at") as f:
+            f.write(line)
+
+    async def write(self, record: dict):
+        await asyncio.to_thread(self._append, record)
+
+    async def record_page(self, method: str, args: list, cursor: Optional[str], result, serialize=serialize_tweet):
+        if result is None:
+            return None
+        await self.write({
+            "method": method,
+            "args": args,
+            "cursor": cursor,
+            "items": [serialize(item) for item in result],
+            "next_cursor": getattr(result, 'next_cursor', None),
+            "previous_cursor": getattr(result, 'previous_cursor', None)
+        })
+
+        async def fetch_next_result():
+            next_result = await result.next()
+            return await self.record_page(method, args, getattr(result, 'next_cursor', None), next_result, serialize)
+
+        return RecordingResult(result, fetch_next_result)
+
+class RecordingClient:
+    """twikit.Client proxy that records timelines, search pages, tweets with replies and notifications"""
+
+    def __init__(self, client, recorder: TwitterRecorder):
+        self.client = client
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    async def get_timeline(self, *args, **kwargs):
+        result = await self.client.get_timeline(*args, **kwargs)
+        return await self.recorder.record_page("get_timeline", [], kwargs.get("cursor"), result)
+
+    async def get_latest_timeline(self, *args, **kwargs):
+        result = await self.client.get_latest_timeline(*args, **kwargs)
+        return await self.recorder.record_page("get_latest_timeline", [], kwargs.get("cursor"), result)
+
+    async def search_tweet(self, query: str, product: str, *args, **kwargs):
+        result = await self.client.search_tweet(query, product, *args, **kwargs)
+        return await self.recorder.record_page("search_tweet", [query, product], kwargs.get("cursor"), result)
+
+    async def get_notifications(self, type: str, *args, **kwargs):
+        result = await self.client.get_notifications(type, *args, **kwargs)
+        return await self.recorder.record_page(
+            "get_notifications", [type], kwargs.get("cursor"), result, serialize_notification
+        )
+
+    async def get_tweet_by_id(self, tweet_id: str, *args, **kwargs):
+        tweet = await self.client.get_tweet_by_id(tweet_id, *args, **kwargs)
+        if tweet is None:
+            return None
+        await self.recorder.write({"method": "get_tweet_by_id", "args": [str(tweet_id)], "item": serialize_tweet(tweet)})
+        if tweet.replies is not None:
+            tweet.replies = await self.recorder.record_page("tweet_replies", [str(tweet_id)], None, tweet.replies)
+        return tweet
+
+class ReplayCorpus:
+    """
+    Recorded responses indexed by method, arguments and cursor
+
+    Unknown arguments fall back to the recorded first pages of the same method in turn,
+    so any request can be replayed.
+    """
+
+    def __init__(self, directory: str):
+        self.pages: Dict[Tuple[str, str, Optional[str]], dict] = {}
+        self.tweets: Dict[str, dict] = {}
+        first_pages: Dict[str, List[dict]] = {}
+
+        paths = sorted(glob.glob(os.path.join(directory, "*.jsonl.gz")))
+        for path in paths:
+            with gzip.open(path, "rt") as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record["method"] == "get_tweet_by_id":
+                        self.tweets.setdefault(record["args"][0], record)
+                        continue
+                    self.pages.setdefault(self.key(record["method"], record["args"], record["cursor"]), record)
+                    if record["cursor"] is None:
+                        first_pages.setdefault(record["method"], []).append(record)
+
+        self.fallbacks = {method: cycle(records) for method, records in first_pages.items()}
+        # Tweets posted during the replay, served back by get_tweet_by_id
+        self.created: Dict[str, dict] = {}
+        self.created_ids = count()
+        logger.info(f"⏯️  Replaying {len(self.pages)} pages and {len(self.tweets)} tweets from {len(paths)} recordings")
+
+    @staticmethod
+    def key(method: str, args: list, cursor: Optional[str]) -> Tuple[str, str, Optional[str]]:
+        return method, json.dumps(args), cursor
+
+    def find_page(self, method: str, args: list, cursor: Optional[str]) -> Optional[dict]:
+        record = self.pages.get(self.key(method, args, cursor))
+        if record is None and cursor is None and method in self.fallbacks:
+            record = next(self.fallbacks[method])
+        return record
+
+    def find_tweet(self, tweet_id: str) -> Optional[dict]:
+        """Recorded or created tweet; unknown IDs are not replaced by another tweet"""
+        return self.tweets.get(str(tweet_id)) or self.created.get(str(tweet_id))
+
+    def next_tweet_id(self) -> str:
+        """Snowflake-like ID from the current time, newer than any recorded tweet"""
+        return str((int(time.time() * 1000) - TWITTER_EPOCH_MS) << 22 | next(self.created_ids) % (1 << 22))
+
+class ReplayClient:
+    """Serves recorded responses as real twikit objects"""
+
+    def __init__(self, corpus: ReplayCorpus):
+        from twikit import Client
+
+        self.corpus = corpus
+        # Only used as the owner of deserialized objects, never for network calls
+        self.owner = Client('en-US')
+
+    def _page(self, record: Optional[dict], deserialize=deserialize_tweet):
+        from twikit.utils import Result
+
+        if record is None:
+            return Result([])
+
+        async def fetch_next_result():
+            next_record = self.corpus.pages.get(self.corpus.key(record["method"], record["args"], record["next_cursor"]))
+            return self._page(next_record, deserialize)
+
+        return Result(
+            [deserialize(self.owner, item) for item in record["items"]],
+            fetch_next_result if record["next_cursor"] else None,
+            record["next_cursor"],
+            None,
+            record["previous_cursor"]
+        )
+
+    async def get_timeline(self, *args, cursor: Optional[str] = None, **kwargs):
+        return self._page(self.corpus.find_page("get_timeline", [], cursor))
+
+    async def get_latest_timeline(self, *args, cursor: Optional[str] = None, **kwargs):
+        return self._page(self.corpus.find_page("get_latest_timeline", [], cursor))
+
+    async def search_tweet(self, query: str, product: str, *args, cursor: Optional[str] = None, **kwargs):
+        return self._page(self.corpus.find_page("search_tweet", [query, product], cursor))
+
+    async def get_notifications(self, type: str, *args, cursor: Optional[str] = None, **kwargs):
+        return self._page(self.corpus.find_page("get_notifications", [type], cursor), deserialize_notification)
+
+    async def get_tweet_by_id(self, tweet_id: str, *args, **kwargs):
+        record = self.corpus.find_tweet(tweet_id)
+        if record is None:
+            from twikit import NotFound
+            raise NotFound(f"Tweet {tweet_id} is not in the replay corpus")
+
+        tweet = deserialize_tweet(self.owner, record["item"])
+        replies = self.corpus.find_page("tweet_replies", [record["args"][0]], None)
+        tweet.replies = self._page(replies) if replies else None
+        return tweet
+
+    async def favorite_tweet(self, tweet_id: str):
+        return {"data": {"favorite_tweet": "Done"}}
+
+    async def create_tweet(self, text: str = "", reply_to: Optional[str] = None, **kwargs):
+        """Synthetic tweet by the replay account; nothing is sent anywhere"""
+        from twikit import User
+        from twikit.utils import build_tweet_data, build_user_data
+
+        parent = self.corpus.find_tweet(reply_to) if reply_to else None
+        parent_user = (parent["item"]["user"] or {}).get("legacy", {}) if parent else {}
+        tweet_id = self.corpus.next_tweet_id()
+        raw_tweet = {
+            "id": tweet_id,
+            "full_text": text,
+            "created_at": datetime.now(timezone.utc).strftime("%a %b %d %H:%M:%S %z %Y"),
+            "lang": "en",
+            "is_quote_status": False,
+            "in_reply_to_status_id_str": str(reply_to) if reply_to else None,
+            "in_reply_to_user_id_str": (parent["item"]["user"] or {}).get("rest_id") if parent else None,
+            "in_reply_to_screen_name": parent_user.get("screen_name"),
+            "quote_count": 0,
+            "reply_count": 0,
+            "favorite_count": 0,
+            "retweet_count": 0,
+            "favorited": False,
+            "entities": {"hashtags": [], "urls": [], "user_mentions": [], "symbols": []}
+        }
+        user = User(self.owner, build_user_data({**REPLAY_ACCOUNT, "entities": {"description": {"urls": []}}}))
+        item = {"data": build_tweet_data(raw_tweet), "user": serialize_user(user)}
+        self.corpus.created[tweet_id] = {"method": "get_tweet_by_id", "args": [tweet_id], "item": item}
+        return deserialize_tweet(self.owner, item)
+
+@lru_cache()
+def get_recorder() -> TwitterRecorder:
+    """Recorder shared by every account, one corpus file per process"""
+    return TwitterRecorder(TWITTER_RECORD_DIR)
+
+@lru_cache()
+def get_replay_corpus() -> ReplayCorpus:
+    """Replay corpus, loaded once and shared by every account"""
+    return ReplayCorpus(TWITTER_REPLAY_DIR)
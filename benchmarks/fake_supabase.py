@@ -0,0 +1,244 @@
+"""
+In-process stand-in for the supabase-py client
+
+Implements the subset of the query builder used by the app (table/select/insert/update/upsert,
+eq/in_/or_/order/limit/range and the upsert_tweets and lease RPCs) over in-memory tables. Every execute() is one
+database round trip: it sleeps for the configured latency and is counted.
+"""
+import operator
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# Kept in sync with sql/02_create_upsert_function.sql
+MUTABLE_TWEET_COLUMNS = ("tweet_text", "tweet_full_text", "tweet_retweet_count", "tweet_likes", "tweet_view_count")
+
+# PostgREST filter operators supported in or_() logic trees
+FILTER_OPERATORS = {"eq": operator.eq, "neq": operator.ne, "lt": operator.lt, "lte": operator.le, "gt": operator.gt, "gte": operator.ge}
+
+def split_conditions(text: str) -> List[str]:
+    """Split a logic tree on the commas that are not inside parentheses or quotes"""
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+def parse_condition(text: str) -> Callable[[dict], bool]:
+    """Row predicate for a PostgREST condition: column.operator.value, and(...) or or(...)"""
+    for logic, combine in (("and", all), ("or", any)):
+        if text.startswith(f"{logic}(") and text.endswith(")"):
+            conditions = [parse_condition(part) for part in split_conditions(text[len(logic) + 1:-1])]
+            return lambda row: combine(condition(row) for condition in conditions)
+    column, name, value = text.split(".", 2)
+    value = value[1:-1] if value.startswith('"') else value
+
+    def check(row: dict) -> bool:
+        row_value = row.get(column)
+        if row_value is None:
+            return False
+        # Compared as the column's type, like the database would
+        return FILTER_OPERATORS[name](row_value, type(row_value)(value))
+    return check
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+@dataclass
+class APIResponse:
+    data: List[dict] = field(default_factory=list)
+    count: Optional[int] = None
+
+class FakeDatabase:
+    def __init__(self, latency_ms: float = 0):
+        self.latency_ms = latency_ms
+        self.tables: Dict[str, Dict[str, dict]] = {}
+        self.primary_keys = {"tweets": "tweet_id", "scheduler_jobs": "name", "deferred_actions": ("action", "tweet_id")}
+        self.lock = threading.Lock()
+        self.round_trips = 0
+
+    def reset_counters(self):
+        with self.lock:
+            self.round_trips = 0
+
+    def table(self, name: str) -> Dict[str, dict]:
+        return self.tables.setdefault(name, {})
+
+    def round_trip(self):
+        """Account for one request to the database"""
+        with self.lock:
+            self.round_trips += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+class QueryBuilder:
+    def __init__(self, db: FakeDatabase, table: str):
+        self.db = db
+        self.table_name = table
+        self.operation = "select"
+        self.payload: Any = None
+        self.filters: List[Callable[[dict], bool]] = []
+        self.order_by: List[tuple] = []
+        self.row_offset = 0
+        self.row_limit: Optional[int] = None
+
+    def select(self, *columns, **kwargs):
+        self.operation = "select"
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.operation, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, **kwargs):
+        self.operation, self.payload = "upsert", rows
+        return self
+
+    def update(self, values: dict, **kwargs):
+        self.operation, self.payload = "update", values
+        return self
+
+    def delete(self, **kwargs):
+        self.operation = "delete"
+        return self
+
+    def eq(self, column: str, value):
+        self.filters.append(lambda row: str(row.get(column)) == str(value))
+        return self
+
+    def in_(self, column: str, values):
+        allowed = {str(value) for value in values}
+        self.filters.append(lambda row: str(row.get(column)) in allowed)
+        return self
+
+    def or_(self, filters: str, **kwargs):
+        self.filters.append(parse_condition(f"or({filters})"))
+        return self
+
+    def order(self, column: str, desc: bool = False, **kwargs):
+        self.order_by.append((column, desc))
+        return self
+
+    def limit(self, count: int, **kwargs):
+        self.row_limit = count
+        return self
+
+    def range(self, start: int, end: int, **kwargs):
+        self.row_offset, self.row_limit = start, end - start + 1
+        return self
+
+    def _matches(self, row: dict) -> bool:
+        return all(check(row) for check in self.filters)
+
+    def _row_id(self, row: dict, default=None) -> str:
+        key = self.db.primary_keys.get(self.table_name, "id")
+        if isinstance(key, tuple):
+            return "|".join(str(row.get(column)) for column in key)
+        return str(row.get(key, default))
+
+    def _write(self, rows, replace: bool) -> List[dict]:
+        table = self.db.table(self.table_name)
+        written = []
+        for row in rows if isinstance(rows, list) else [rows]:
+            row_id = self._row_id(row, len(table))
+            if row_id in table and not replace:
+                raise ValueError(f"duplicate key value violates unique constraint on {self.table_name}")
+            table[row_id] = {**table.get(row_id, {}), **row}
+            written.append(table[row_id])
+        return written
+
+    def execute(self) -> APIResponse:
+        self.db.round_trip()
+        with self.db.lock:
+            if self.operation == "insert":
+                return APIResponse(self._write(self.payload, replace=False))
+            if self.operation == "upsert":
+                return APIResponse(self._write(self.payload, replace=True))
+
+            table = self.db.table(self.table_name)
+            rows = [row for row in table.values() if self._matches(row)]
+            if self.operation == "update":
+                for row in rows:
+                    row.update(self.payload)
+            elif self.operation == "delete":
+                for row in rows:
+                    table.pop(self._row_id(row), None)
+            # Stable sorts from the last key to the first give the combined order
+            for column, desc in reversed(self.order_by):
+                rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            rows = rows[self.row_offset:]
+            if self.row_limit is not None:
+                rows = rows[:self.row_limit]
+            return APIResponse([dict(row) for row in rows])
+
+class RpcBuilder:
+    def __init__(self, db: FakeDatabase, name: str, params: dict):
+        self.db = db
+        self.name = name
+        self.params = params
+
+    def execute(self) -> APIResponse:
+        handler = getattr(self, f"_{self.name}", None)
+        if handler is None:
+            raise NotImplementedError(f"RPC {self.name} is not available in the fake database")
+        self.db.round_trip()
+        with self.db.lock:
+            return APIResponse(handler(**self.params))
+
+    def _upsert_tweets(self, p_tweets: List[dict]):
+        table = self.db.table("tweets")
+        rows = []
+        # One statement, so every row gets the same CURRENT_TIMESTAMP
+        now = now_iso()
+        for tweet in p_tweets:
+            existing = table.get(tweet["tweet_id"])
+            if existing is None:
+                table[tweet["tweet_id"]] = {**tweet, "created_at": now, "updated_at": now}
+                rows.append({"tweet_id": tweet["tweet_id"], "inserted": True})
+            elif any(existing.get(column) != tweet.get(column) for column in MUTABLE_TWEET_COLUMNS):
+                # Like the SQL function: only mutable columns, and unchanged rows are not returned
+                existing.update({column: tweet.get(column) for column in MUTABLE_TWEET_COLUMNS}, updated_at=now)
+                rows.append({"tweet_id": tweet["tweet_id"], "inserted": False})
+        return rows
+
+    # Kept in sync with sql/03_create_scheduler_lease.sql
+    def _acquire_lease(self, p_name: str, p_holder: str, p_ttl_seconds: int):
+        leases = self.db.table("scheduler_leases")
+        lease = leases.get(p_name)
+        now = time.time()
+        if lease is None or lease["holder"] == p_holder or lease["expires_at"] < now:
+            leases[p_name] = {"name": p_name, "holder": p_holder, "expires_at": now + p_ttl_seconds}
+            return True
+        return False
+
+    def _release_lease(self, p_name: str, p_holder: str):
+        leases = self.db.table("scheduler_leases")
+        if leases.get(p_name, {}).get("holder") == p_holder:
+            del leases[p_name]
+        return None
+
+class Client:
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+
+    def table(self, name: str) -> QueryBuilder:
+        return QueryBuilder(self.db, name)
+
+    def rpc(self, name: str, params: Optional[dict] = None) -> RpcBuilder:
+        return RpcBuilder(self.db, name, params or {})
+
+# The database behind every client created by create_client
+database = FakeDatabase()
+
+def create_client(url: str, key: str) -> Client:
+    return Client(database)
@@ -0,0 +1,198 @@
+"""
+Endpoint benchmarks against the mock Twitter backend and an in-process Supabase stand-in
+
+    python -m benchmarks.run --concurrency 1,8,32 --requests 200 --db-latency-ms 5
+
+Results are printed and saved as JSON under benchmarks/results/ so runs can be compared across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import cycle
+from typing import Callable, Dict, List
+
+# The app reads its settings at import time, so configure it before importing anything from app
+os.environ["USE_TWITTER_MOCKS"] = "true"
+os.environ.setdefault("TWITTER_USERNAME", "benchmark")
+os.environ.setdefault("SUPABASE_API_URL", "http://fake-supabase")
+os.environ.setdefault("SUPABASE_API_KEY", "fake-key")
+STATE_DIR = tempfile.mkdtemp(prefix="twemate-bench-")
+os.environ.setdefault("ACTION_QUEUE_FILE", os.path.join(STATE_DIR, "action_queue.json"))
+os.environ.setdefault("NOTIFICATION_STATE_FILE", os.path.join(STATE_DIR, "notification_state.json"))
+os.environ.setdefault("PROCESSED_INDEX_FILE", os.path.join(STATE_DIR, "processed_notifications.sqlite3"))
+os.environ.setdefault("HIGH_WATER_MARKS_FILE", os.path.join(STATE_DIR, "high_water_marks.json"))
+os.environ.setdefault("SCHEDULER_NOTIFICATION_STATE_FILE", os.path.join(STATE_DIR, "scheduler_notification_state.json"))
+os.environ.setdefault("SCHEDULER_STATE_FILE", os.path.join(STATE_DIR, "scheduler_state.json"))
+os.environ.setdefault("ACTION_INBOX_FILE", os.path.join(STATE_DIR, "action_inbox.json"))
+os.environ.setdefault("LEADER_LOCK_FILE", os.path.join(STATE_DIR, "scheduler.lock"))
+
+from benchmarks import fake_supabase
+
+# get_supabase() imports create_client lazily, so the app picks up the fake module
+sys.modules["supabase"] = fake_supabase
+
+import httpx
+from app.main import app
+from app.services import rate_limiter as rate_limiter_module
+from app.services.seen_tweets import seen_tweets
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def notification_payload(tweet: dict) -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "text": tweet["text"],
+        "author": {"name": tweet["tweet_user_name"], "username": tweet["tweet_user_nick"], "avatar": ""},
+        "metrics": {"replies": "0", "retweets": str(tweet["retweets"]), "likes": str(tweet["likes"])},
+        "media": {"has_images": bool(tweet["photo_urls"]), "has_video": False},
+        "is_reply": False,
+        "lang": tweet["tweet_lang"],
+        "created_at": now,
+        "id": tweet["tweet_id"],
+        "url": f"https://x.com/{tweet['tweet_user_nick']}/status/{tweet['tweet_id']}",
+        "timestamp": now,
+        # Test notifications are not recorded as processed, so repeated payloads do the full work
+        "test_mode": True
+    }
+
+def build_scenarios(sample_tweets: List[dict]) -> Dict[str, Callable[[httpx.AsyncClient], object]]:
+    """Scenario name -> coroutine function sending one request"""
+    payloads = cycle([notification_payload(tweet) for tweet in sample_tweets])
+    batch = [notification_payload(tweet) for tweet in sample_tweets[:10]]
+
+    return {
+        # One page per request; longer searches are dominated by the delay between pages
+        "search_tweets": lambda client: client.post(
+            "/api/tweets/search_tweets", json={"query": "python", "minimum_tweets": 20, "save_to_db": True}
+        ),
+        "timeline": lambda client: client.post("/api/tweets/timeline", json={"minimum_tweets": 20}),
+        "latest_timeline": lambda client: client.post("/api/tweets/latest_timeline", json={"minimum_tweets": 20}),
+        "notifications": lambda client: client.get("/api/notifications/", params={"limit": 40}),
+        "process_notification": lambda client: client.post("/api/notifications/", json=next(payloads)),
+        "process_notification_batch": lambda client: client.post("/api/notifications/batch", json=batch),
+    }
+
+def percentile(sorted_values: List[float], share: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(share * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    send: Callable,
+    concurrency: int,
+    total_requests: int,
+    warm_seen_tweets: bool = False
+) -> dict:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = iter(range(total_requests))
+
+    async def worker():
+        for _ in remaining:
+            if not warm_seen_tweets:
+                # The mock data is the same on every request, so a warm index would skip every write
+                seen_tweets.fingerprints.clear()
+            started_at = time.perf_counter()
+            response = await send(client)
+            latencies.append(time.perf_counter() - started_at)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    fake_supabase.database.reset_counters()
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(total_requests / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "db_round_trips_per_request": round(fake_supabase.database.round_trips / total_requests, 3),
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def main(args) -> dict:
+    fake_supabase.database.latency_ms = args.db_latency_ms
+    if not args.keep_rate_limits:
+        # Measure the app itself rather than the 15-minute Twitter quotas
+        for endpoint in rate_limiter_module.DEFAULT_RATE_LIMITS:
+            rate_limiter_module.DEFAULT_RATE_LIMITS[endpoint] = 10 ** 9
+        rate_limiter_module.DEFAULT_RATE_LIMIT = 10 ** 9
+
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    # httpx does not run the lifespan, so enter it here
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            sample = await client.post("/api/tweets/timeline", json={"minimum_tweets": 20})
+            sample.raise_for_status()
+            scenarios = build_scenarios(sample.json())
+
+            for name, send in scenarios.items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+                for concurrency in args.concurrency:
+                    result = {"scenario": name, **await run_scenario(client, send, concurrency, args.requests, args.warm_seen_tweets)}
+                    results.append(result)
+                    print(
+                        f"{name:<28} c={concurrency:<4} {result['throughput_rps']:>9} req/s  "
+                        f"p50={result['p50_ms']:>8}ms  p95={result['p95_ms']:>8}ms  p99={result['p99_ms']:>8}ms  "
+                        f"db/req={result['db_round_trips_per_request']}  {result['status_codes']}"
+                    )
+
+    return {
+        "revision": git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "settings": {
+            "db_latency_ms": args.db_latency_ms,
+            "requests": args.requests,
+            "keep_rate_limits": args.keep_rate_limits,
+            "warm_seen_tweets": args.warm_seen_tweets,
+            "mock_latency_ms": [os.getenv("TWITTER_MOCK_LATENCY_MIN_MS", "0"), os.getenv("TWITTER_MOCK_LATENCY_MAX_MS", "0")],
+        },
+        "results": results,
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the API endpoints against mocked Twitter and Supabase")
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0, help="Latency of every fake Supabase round trip")
+    parser.add_argument("--scenarios", nargs="*", help="Only run these scenarios")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Keep the real per-account Twitter quotas")
+    parser.add_argument(
+        "--warm-seen-tweets", action="store_true",
+        help="Keep the seen-tweet index between requests, measuring the path where unchanged tweets skip the database"
+    )
+    parser.add_argument("--output", help="Where to save the JSON results (default: benchmarks/results/<time>-<revision>.json)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{report['revision']}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
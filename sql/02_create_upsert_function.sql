@@ -0,0 +1,47 @@
+-- Bulk upsert of a batch of tweets in a single statement.
+-- Existing tweets only get their mutable columns (text and counters) rewritten,
+-- and only when one of them changed, so unchanged rows are not touched at all.
+-- Returns one row per inserted or updated tweet with a flag telling whether it was newly inserted;
+-- unchanged tweets are not returned.
+CREATE OR REPLACE FUNCTION upsert_tweets(p_tweets JSONB)
+RETURNS TABLE (tweet_id TEXT, inserted BOOLEAN)
+LANGUAGE sql
+AS $$
+    INSERT INTO tweets AS t (
+        tweet_id,
+        tweet_user_name,
+        tweet_user_nick,
+        tweet_text,
+        tweet_full_text,
+        tweet_created_at_datetime,
+        tweet_retweet_count,
+        tweet_likes,
+        tweet_photo_urls,
+        tweet_lang,
+        tweet_view_count
+    )
+    SELECT DISTINCT ON (src.tweet_id)
+        src.tweet_id,
+        src.tweet_user_name,
+        src.tweet_user_nick,
+        src.tweet_text,
+        src.tweet_full_text,
+        src.tweet_created_at_datetime,
+        src.tweet_retweet_count,
+        src.tweet_likes,
+        src.tweet_photo_urls,
+        src.tweet_lang,
+        COALESCE(src.tweet_view_count, 0)
+    FROM jsonb_populate_recordset(NULL::tweets, p_tweets) AS src
+    ON CONFLICT (tweet_id) DO UPDATE SET
+        tweet_text = EXCLUDED.tweet_text,
+        tweet_full_text = EXCLUDED.tweet_full_text,
+        tweet_retweet_count = EXCLUDED.tweet_retweet_count,
+        tweet_likes = EXCLUDED.tweet_likes,
+        tweet_view_count = EXCLUDED.tweet_view_count,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE (t.tweet_text, t.tweet_full_text, t.tweet_retweet_count, t.tweet_likes, t.tweet_view_count)
+        IS DISTINCT FROM
+        (EXCLUDED.tweet_text, EXCLUDED.tweet_full_text, EXCLUDED.tweet_retweet_count, EXCLUDED.tweet_likes, EXCLUDED.tweet_view_count)
+    RETURNING t.tweet_id, (t.xmax = 0) AS inserted;
+$$;
@@ -0,0 +1,58 @@
+-- Lease for leader election between API processes (LEADER_ELECTION=supabase).
+-- Only the holder of the "scheduler" lease runs scheduler jobs; it renews the lease
+-- periodically and another process takes it over once it expires.
+-- Expiry is checked against the database clock, so process clocks do not matter.
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+-- Takes the lease if it is free or expired, or renews it for its current holder.
+-- Returns true if p_holder holds the lease afterwards.
+CREATE OR REPLACE FUNCTION acquire_lease(p_name TEXT, p_holder TEXT, p_ttl_seconds INTEGER)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_holder TEXT;
+BEGIN
+    INSERT INTO scheduler_leases AS l (name, holder, expires_at)
+    VALUES (p_name, p_holder, NOW() + make_interval(secs => p_ttl_seconds))
+    ON CONFLICT (name) DO UPDATE
+        SET holder = EXCLUDED.holder,
+            expires_at = EXCLUDED.expires_at
+        WHERE l.holder = EXCLUDED.holder OR l.expires_at < NOW()
+    RETURNING l.holder INTO v_holder;
+
+    RETURN v_holder IS NOT NULL;
+END;
+$$;
+
+-- Gives the lease up on shutdown so another process does not wait for it to expire.
+CREATE OR REPLACE FUNCTION release_lease(p_name TEXT, p_holder TEXT)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    DELETE FROM scheduler_leases WHERE name = p_name AND holder = p_holder;
+$$;
+
+-- What the operator asked of each job, written by any process and applied by the leader
+-- when it is elected and on every lease renewal.
+-- config is set by POST /scheduler/jobs and replaces the job's config on every process.
+CREATE TABLE IF NOT EXISTS scheduler_jobs (
+    name TEXT PRIMARY KEY,
+    running BOOLEAN NOT NULL DEFAULT FALSE,
+    minimum_tweets INTEGER,
+    config JSONB
+);
+
+-- Deferred actions (auto-likes) found by processes that are not the leader.
+-- The leader moves them into its action queue and deletes them.
+CREATE TABLE IF NOT EXISTS deferred_actions (
+    action TEXT NOT NULL,
+    tweet_id TEXT NOT NULL,
+    enqueued_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (action, tweet_id)
+);